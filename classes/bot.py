@@ -2,10 +2,14 @@ from __future__ import annotations
 
 from abc        import ABC
 from discord    import Bot
-from typing     import TYPE_CHECKING, List
+from typing     import Any, Dict, Optional
 
-if TYPE_CHECKING:
-    from guild  import GuildData
+from classes.registry       import GuildRegistry
+from utilities.database     import db
+from utilities.migrations   import apply_migrations
+from utilities.profiler     import boot_profiler
+from utilities.snapshot     import config_snapshot
+from utilities.stats        import crosspost_log, stats_buffer
 ####################################################################################################
 
 __all__ = ("KinoKi", )
@@ -16,9 +20,9 @@ class KinoKi(Bot, ABC):
 
         Attributes:
         -----------
-        k_guilds: List[:class:`GuildData`]
-            A list of custom guild objects that hold data pertaining
-            to bot features.
+        k_guilds: :class:`GuildRegistry`
+            An ID-keyed registry of custom guild objects that hold data
+            pertaining to bot features.
 
     """
 
@@ -29,6 +33,56 @@ class KinoKi(Bot, ABC):
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
 
-        self.k_guilds: List[GuildData] = []
+        self.k_guilds: GuildRegistry = GuildRegistry()
+
+####################################################################################################
+    async def start(self, *args, **kwargs) -> None:
+        """Opens the database pool, brings the schema up to date and replays any
+        journaled writes before connecting to the gateway, so guilds load against it.
+        The config snapshot is read first, so guilds delivered before ``on_ready``
+        can be served from it rather than waiting on their first database read."""
+
+        with boot_profiler.phase("config_snapshot"):
+            await config_snapshot.open()
+        with boot_profiler.phase("db_connect"):
+            await db.connect()
+        with boot_profiler.phase("migrations"):
+            await apply_migrations()
+        # Writes journaled during an outage go in before any guild config is read.
+        with boot_profiler.phase("journal_replay"):
+            await db.replay_journal()
+        stats_buffer.start()
+        crosspost_log.start()
+        config_snapshot.start(self.snapshot_config)
+
+        # Ended by the first `on_ready`, in the `Internal` cog.
+        boot_profiler.begin("gateway")
+        await super().start(*args, **kwargs)
+
+####################################################################################################
+    async def close(self) -> None:
+
+        await super().close()
+        await stats_buffer.stop()
+        await crosspost_log.stop()
+        await config_snapshot.stop()
+        await db.close()
+
+####################################################################################################
+    def snapshot_config(self) -> Dict[int, Optional[Dict[str, Any]]]:
+        """Returns the config of every configured guild for the config snapshot.
+        Guilds not loaded yet map to ``None``, keeping whatever the snapshot already holds."""
+
+        config: Dict[int, Optional[Dict[str, Any]]] = {
+            guild.id: None for guild in self.k_guilds.deferred
+        }
+        for guild_data in self.k_guilds:
+            job_postings = guild_data.job_postings
+            if job_postings is None:
+                continue
+            if job_postings.source_ids or job_postings.post_ids or job_postings.tags:
+                config[guild_data.parent.id] = job_postings.to_snapshot()
+
+        return config
 
 ####################################################################################################
@@ -1,12 +1,16 @@
 from __future__ import annotations
 
+import asyncio
+
 from discord    import Guild
-from typing     import TYPE_CHECKING, List, Optional, TypeVar
+from typing     import TYPE_CHECKING, Any, Dict, List, Optional, TypeVar
 
 from classes.jobs   import JobPostings
+from utilities      import config_snapshot, db, stats_buffer
 
 if TYPE_CHECKING:
-    from classes.bot    import KinoKi
+    from classes.bot            import KinoKi
+    from utilities.database     import GuildRecords
 ####################################################################################################
 
 __all__ = ("GuildData", )
@@ -37,9 +41,82 @@ class GuildData:
         self.job_postings: Optional[JobPostings] = None
 
 ####################################################################################################
-    async def load(self, bot: KinoKi):
+    async def load(self, bot: KinoKi, records: Optional[GuildRecords] = None):
+
+        self.job_postings = await JobPostings.load(bot=bot, guild=self, records=records)
+
+####################################################################################################
+    def restore(self, data: Dict[str, Any]) -> None:
+        """Fills this guild's config from its entry in the config snapshot, without
+        any database or API calls. It should be reloaded once the database is reachable."""
+
+        self.job_postings = JobPostings.from_snapshot(self, data)
+
+####################################################################################################
+    def rebind(self, parent: Guild) -> None:
+        """Points this data at a new :class:`Guild` object for the same guild, as
+        created when the gateway session is re-established. Config is stored as
+        IDs, so only the name-based indexes need rebuilding from the new cache."""
+
+        self.parent = parent
+
+        if self.job_postings is not None:
+            self.job_postings.reindex_tag_names()
+            self.job_postings.refresh_routes()
+
+####################################################################################################
+    async def reload(
+        self,
+        bot: KinoKi,
+        records: Optional[GuildRecords] = None,
+        version: Optional[int] = None
+    ) -> None:
+        """Re-reads this guild's config from the database, such as after another
+        process changed it.
+
+        The fresh config is copied into the existing :class:`JobPostings` in one
+        step, so readers never see a half-loaded state and anything holding it
+        stays current. If a local write overlapped the read, the read is repeated,
+        since it may predate that write.
+
+        Nothing is read while this process still has journaled writes the database
+        lacks; the config in memory already reflects them and is kept. Listeners
+        are told to reload again once the journal has been replayed.
+
+        ``records`` may be fetched in bulk by the caller, who then checks the
+        journal itself and passes the :attr:`JobPostings.config_version` read
+        before fetching them.
+        """
+
+        current = self.job_postings
+
+        if records is None and not await db.drain_journal():
+            print(f"Reload of {self.parent.name} ({self.parent.id}) postponed: journaled writes pending.")
+            return
+
+        while True:
+            if records is None:
+                version = current.config_version if current is not None else None
+            job_postings = await JobPostings.load(bot=bot, guild=self, records=records)
+            records = None
+
+            if current is None or (version is not None and current.config_version == version):
+                break
+
+            # Let the overlapping write finish before reading again.
+            await asyncio.sleep(0.1)
+
+        # Counts still waiting in the stats buffer aren't in the database yet.
+        for (guild_id, role_id), amount in stats_buffer.pending.items():
+            if guild_id == self.parent.id:
+                job_postings.stats[role_id] = job_postings.stats.get(role_id, 0) + amount
+
+        if current is not None:
+            current.replace_config(job_postings)
+        else:
+            self.job_postings = job_postings
 
-        self.job_postings = await JobPostings.load(bot=bot, guild=self)
+        config_snapshot.changed()
 
 ####################################################################################################
 ####################################################################################################
@@ -1,6 +1,13 @@
 from __future__ import annotations
 
+import asyncio
+import os
+import time
+
+from array          import array
+from contextlib     import asynccontextmanager
 from dataclasses    import dataclass
+from datetime       import datetime, timedelta, timezone
 from discord.abc    import GuildChannel
 from discord        import (
     ChannelType,
@@ -9,22 +16,32 @@ from discord        import (
     EmbedField,
     ForumChannel,
     ForumTag,
+    Guild,
     Interaction,
     Role,
     TextChannel,
+    Thread,
 )
 from discord.ext.pages  import Paginator
+from types          import MappingProxyType
 from typing         import (
     TYPE_CHECKING,
+    Any,
+    AsyncIterator,
     Dict,
+    Iterable,
     List,
+    Mapping,
+    NamedTuple,
     Optional,
+    Set,
     Tuple,
     Type,
     Union
 )
 
 from assets.emojis  import BotEmojis
+from classes.resolver   import GuildResolver
 from ui             import *
 from utilities      import *
 
@@ -36,238 +53,440 @@ if TYPE_CHECKING:
 __all__ = ("JobPostings", )
 
 ####################################################################################################
-@dataclass
-class JobTag:
-    """Represents data involving a Forum Tag / Role Pairing."""
+class TagRoute(NamedTuple):
+    """The precompiled crosspost routing entry for a single source forum tag.
+
+    Attributes:
+    -----------
+    role_ids: Tuple[:class:`int`, ...]
+        The de-duplicated IDs of the roles to mention when the tag is applied to a new thread.
+
+    tracked: Tuple[:class:`int`, ...]
+        The subset of ``role_ids`` matched by name, whose posting stats are counted.
+    """
+
+    role_ids: Tuple[int, ...]
+    tracked: Tuple[int, ...]
+
+####################################################################################################
+class DeliveryStats:
+    """Running crosspost delivery figures for a single destination channel."""
 
     __slots__ = (
-        "channel",
-        "parent",
-        "roles"
+        "sends",
+        "failures",
+        "total_latency",
+        "last_error"
     )
 
-    channel: ForumChannel
-    parent: ForumTag
-    roles: List[Role]
+    def __init__(self):
+
+        self.sends: int = 0
+        self.failures: int = 0
+        self.total_latency: float = 0.0
+        self.last_error: Optional[str] = None
+
+    @property
+    def average_latency(self) -> float:
+        """Mean seconds per successful send."""
+
+        return self.total_latency / self.sends if self.sends else 0.0
 
 ####################################################################################################
-    @classmethod
-    def new(
-        cls: Type[JobTag],
-        *,
-        guild_id: int,
-        channel: ForumChannel,
-        parent: ForumTag,
-        role: Role
-    ) -> JobTag:
-
-        c = db_connection.cursor()
-        c.execute(
-            "INSERT INTO job_tags (guild_id, channel_id, tag_id, role_ids) "
-            "VALUES (%s, %s, %s, %s)",
-            (guild_id, channel.id, parent.id, [role.id])
-        )
+@dataclass(eq=False)
+class JobTag:
+    """Represents data involving a Forum Tag / Role Pairing.
 
-        db_connection.commit()
-        c.close()
+    Only IDs are stored; the forum channel, tag and roles are resolved through
+    the guild's cache when needed. Compared and hashed by identity, so instances
+    can be kept in the role index of their :class:`JobPostings`.
+    """
 
-        return cls(
-            channel=channel,
-            parent=parent,
-            roles=[role]
-        )
+    __slots__ = (
+        "channel_id",
+        "tag_id",
+        "role_ids"
+    )
+
+    channel_id: int
+    tag_id: int
+    role_ids: array
 
 ####################################################################################################
-    def delete(self) -> None:
+    def channel(self, guild: Guild) -> Optional[ForumChannel]:
 
-        c = db_connection.cursor()
-        c.execute(
-            "DELETE FROM job_tags WHERE channel_id = %s AND tag_id = %s",
-            (self.channel.id, self.parent.id)
-        )
+        return guild.get_channel(self.channel_id)  # type: ignore
 
-        db_connection.commit()
-        c.close()
+####################################################################################################
+    def tag(self, guild: Guild) -> Optional[ForumTag]:
 
-        return
+        channel = self.channel(guild)
+        return channel.get_tag(self.tag_id) if channel is not None else None
 
 ####################################################################################################
-    def status(self) -> Embed:
+    def status(self, guild: Guild) -> Embed:
 
-        roles = "\n- ".join([role.mention for role in self.roles])
+        roles = "\n- ".join([f"<@&{role_id}>" for role_id in self.role_ids])
+        tag = self.tag(guild)
 
         return make_embed(
-            title=f"Roles Mapped to Job Tag: {self.parent.name}",
+            title=f"Roles Mapped to Job Tag: {tag.name if tag else self.tag_id}",
             description=(
-                f"__**Parent Channel:** {self.channel.mention}__\n"
+                f"__**Parent Channel:** <#{self.channel_id}>__\n"
                 f"- {roles}"
             ),
             timestamp=False
         )
 
 ####################################################################################################
-    def remove_role(self, role: Role) -> None:
-
-        for i, r in enumerate(self.roles):
-            if r.id == role.id:
-                self.roles.pop(i)
+    def add_role(self, role_id: int) -> None:
+        """Adds the role to this tag in memory only; :class:`JobPostings` persists the change."""
 
-        self.update()
+        if role_id not in self.role_ids:
+            self.role_ids.append(role_id)
 
 ####################################################################################################
-    def update(self, *, role: Optional[Role] = None) -> None:
+    def remove_role(self, role_id: int) -> None:
+        """Removes the role from this tag in memory only; :class:`JobPostings` persists the change."""
 
-        if role is not None:
-            self.roles.append(role)
-
-        role_ids = [r.id for r in self.roles]
-
-        c = db_connection.cursor()
-        c.execute(
-            "UPDATE job_tags SET role_ids = %s WHERE channel_id = %s",
-            (role_ids, self.channel.id)
-        )
-
-        db_connection.commit()
-        c.close()
-
-        return
+        self.role_ids = array("Q", [r for r in self.role_ids if r != role_id])
 
 ####################################################################################################
 class JobPostings:
-    """Represents a collection of data pertaining to job posting functions for a single guild."""
+    """Represents a collection of data pertaining to job posting functions for a single guild.
+
+    Configuration is held as channel and role IDs and resolved to live objects
+    through the guild's gateway cache at use time, so nothing here goes stale
+    when Discord replaces a channel or role object.
+    """
 
     __slots__ = (
         "guild",
-        "source_channels",
-        "post_channels",
+        "source_ids",
+        "post_ids",
         "tags",
-        "stats"
+        "stats",
+        "deliveries",
+        "_routes",
+        "_role_index",
+        "_tag_names",
+        "_tag_channels",
+        "_tag_keys",
+        "_writes",
+        "_writing"
     )
 
 ####################################################################################################
     def __init__(
         self,
         guild: GuildData,
-        source_channels: List[ForumChannel],
-        post_channels: List[TextChannel],
+        source_ids: Set[int],
+        post_ids: Set[int],
         tags: List[JobTag],
         stats: Dict[int, int]
     ):
 
         self.guild: GuildData = guild
 
-        self.source_channels: List[ForumChannel] = source_channels
-        self.post_channels: List[TextChannel] = post_channels
+        self.source_ids: Set[int] = source_ids
+        self.post_ids: Set[int] = post_ids
         self.tags: List[JobTag] = tags
 
         self.stats: Dict[int, int] = stats
+        self.deliveries: Dict[int, DeliveryStats] = {}
+
+        self._role_index: Dict[int, Dict[JobTag, None]] = {}
+        self.reindex_roles()
+
+        self._tag_names: Dict[str, List[Tuple[int, int]]] = {}
+        self._tag_channels: Dict[int, int] = {}
+        self._tag_keys: Dict[int, str] = {}
+        self.reindex_tag_names()
+
+        self._routes: Mapping[int, TagRoute] = MappingProxyType({})
+        self.refresh_routes()
+
+        self._writes: int = 0
+        self._writing: int = 0
+
+####################################################################################################
+    @property
+    def config_version(self) -> Optional[int]:
+        """Counts the config writes made through this object, or ``None`` while
+        one is in progress. A reload whose read overlapped a change of this value
+        may have missed the write, and must read again."""
+
+        return None if self._writing else self._writes
+
+####################################################################################################
+    @asynccontextmanager
+    async def _config_write(self) -> AsyncIterator[None]:
+        """Wraps a database write and the memory changes that follow it. Once they've
+        succeeded, the config snapshot is updated too."""
+
+        self._writing += 1
+        try:
+            yield
+        finally:
+            self._writing -= 1
+            self._writes += 1
+
+        config_snapshot.changed()
+
+####################################################################################################
+    def replace_config(self, other: JobPostings) -> None:
+        """Takes over the config and indexes of ``other``, a freshly loaded copy.
+
+        Done in place, without awaiting, so anything holding this object (such as a
+        view waiting on a user) keeps acting on the live config. Delivery stats are kept.
+        """
+
+        self.source_ids = other.source_ids
+        self.post_ids = other.post_ids
+        self.tags = other.tags
+        self.stats = other.stats
+
+        self._role_index = other._role_index
+        self._tag_names = other._tag_names
+        self._tag_channels = other._tag_channels
+        self._tag_keys = other._tag_keys
+        self._routes = other._routes
+
+####################################################################################################
+    def reindex_roles(self) -> None:
+        """Rebuilds the role ID -> mapped :class:`JobTag` index from scratch."""
+
+        self._role_index = {}
+        for tag in self.tags:
+            for role_id in tag.role_ids:
+                self._index_role(tag, role_id)
+
+####################################################################################################
+    def _index_role(self, tag: JobTag, role_id: int) -> None:
+
+        # A dict is used as an insertion-ordered set so listings stay in mapping order.
+        self._role_index.setdefault(role_id, {})[tag] = None
+
+####################################################################################################
+    def _unindex_role(self, tag: JobTag, role_id: int) -> None:
+
+        mapped = self._role_index.get(role_id)
+        if mapped is None:
+            return
+
+        mapped.pop(tag, None)
+        if not mapped:
+            del self._role_index[role_id]
+
+####################################################################################################
+    def tags_for_role(self, role_id: int) -> List[JobTag]:
+        """Returns every :class:`JobTag` the role with the given ID is mapped to."""
+
+        return list(self._role_index.get(role_id, ()))
+
+####################################################################################################
+    @property
+    def source_channels(self) -> List[ForumChannel]:
+        """The source forums that still exist, resolved from the guild cache."""
+
+        return self._resolve_channels(self.source_ids)  # type: ignore
+
+####################################################################################################
+    @property
+    def post_channels(self) -> List[TextChannel]:
+        """The destination channels that still exist, resolved from the guild cache."""
+
+        return self._resolve_channels(self.post_ids)  # type: ignore
+
+####################################################################################################
+    def _resolve_channels(self, channel_ids: Iterable[int]) -> List[GuildChannel]:
+
+        channels = []
+        for channel_id in sorted(channel_ids):
+            channel = self.guild.parent.get_channel(channel_id)
+            if channel is not None:
+                channels.append(channel)
+
+        return channels
+
+####################################################################################################
+    @property
+    def routes(self) -> Mapping[int, TagRoute]:
+        """A read-only mapping of source forum tag ID to the :class:`TagRoute`
+        used when crossposting a thread with that tag applied."""
+
+        return self._routes
+
+####################################################################################################
+    def refresh_routes(self, names: Optional[Iterable[str]] = None) -> None:
+        """Recompiles the tag routing table.
+
+        Parameters:
+        -----------
+        names: Optional[Iterable[:class:`str`]]
+            The tag names whose routes should be rebuilt. Matching is case-insensitive.
+            If omitted, the entire table is rebuilt.
+        """
+
+        if names is None:
+            routes: Dict[int, TagRoute] = {}
+            wanted = set(self._tag_names)
+        else:
+            # Drop any stale entries for the requested names, they'll be rebuilt below.
+            wanted = {n.casefold() for n in names}
+            stale = {tag_id for key in wanted for _, tag_id in self._tag_names.get(key, ())}
+            routes = {
+                tag_id: route for tag_id, route in self._routes.items()
+                if tag_id not in stale
+            }
+
+        named_roles: Dict[str, List[int]] = {}
+        for role in self.guild.parent.roles:
+            key = role.name.casefold()
+            if key in wanted:
+                named_roles.setdefault(key, []).append(role.id)
+
+        mapped_roles: Dict[str, List[int]] = {}
+        for job_tag in self.tags:
+            key = self._tag_keys.get(job_tag.tag_id)
+            if key in wanted:
+                mapped_roles.setdefault(key, []).extend(job_tag.role_ids)
+
+        for key in wanted:
+            tracked = tuple(named_roles.get(key, ()))
+            roles = tuple(dict.fromkeys(tracked + tuple(mapped_roles.get(key, ()))))
+            if not roles:
+                continue
+
+            for _, tag_id in self._tag_names.get(key, ()):
+                routes[tag_id] = TagRoute(roles, tracked)
+
+        self._routes = MappingProxyType(routes)
+
+####################################################################################################
+    def reindex_tag_names(self) -> None:
+        """Rebuilds the casefolded tag name index over the tags available in every source forum."""
+
+        names: Dict[str, List[Tuple[int, int]]] = {}
+        channels: Dict[int, int] = {}
+        keys: Dict[int, str] = {}
+
+        for channel in self.source_channels:
+            for tag in channel.available_tags:
+                key = tag.name.casefold()
+                names.setdefault(key, []).append((channel.id, tag.id))
+                channels[tag.id] = channel.id
+                keys[tag.id] = key
+
+        self._tag_names = names
+        self._tag_channels = channels
+        self._tag_keys = keys
 
 ####################################################################################################
     @classmethod
-    async def load(cls: Type[JobPostings], *, bot: KinoKi, guild: GuildData) -> JobPostings:
+    async def load(
+        cls: Type[JobPostings],
+        *,
+        bot: KinoKi,
+        guild: GuildData,
+        records: Optional[GuildRecords] = None
+    ) -> JobPostings:
+        """Builds the guild's job posting data from its stored configuration.
 
-        source_channels: List[ForumChannel] = []
-        post_channels: List[TextChannel] = []
+        If ``records`` isn't provided (e.g. when not part of a bulk load),
+        they're fetched from the database for this guild alone.
+        """
 
         # Channel type validation is done when the data is stored, so any channels
         # returned during this load will be of the proper type. Unless they're
         # deleted, in which case the ID is ignored and will be overwritten in the
         # database on the next `self.update()` call.
 
-        c = db_connection.cursor()
-        c.execute(
-            "SELECT sources, destinations FROM job_postings WHERE guild_id = %s",
-            (guild.parent.id,)
-        )
+        if records is None:
+            records = (await db.fetch_guild_records([guild.parent.id]))[guild.parent.id]
 
-        data = c.fetchone()
+        data = records.postings
 
-        source_ids = [int(i) for i in convert_database_list(data[0])]
-        post_ids = [int(i) for i in convert_database_list(data[1])]
+        source_ids = (data["sources"] or []) if data else []
+        post_ids = (data["destinations"] or []) if data else []
 
-        for channel_id in source_ids:
-            source_channel = guild.parent.get_channel(channel_id)
-            if source_channel is None:
-                try:
-                    source_channel = await bot.fetch_channel(channel_id)
-                except:
-                    pass
-                else:
-                    source_channels.append(source_channel)  # type: ignore
-            else:
-                source_channels.append(source_channel)  # type: ignore
+        resolver = GuildResolver(guild.parent)
 
-        for channel_id in post_ids:
-            post_channel = guild.parent.get_channel(channel_id)
-            if post_channel is None:
-                try:
-                    post_channel = await bot.fetch_channel(channel_id)
-                except:
-                    pass
-                else:
-                    post_channels.append(post_channel)  # type: ignore
-            else:
-                post_channels.append(post_channel)  # type: ignore
-
-        c.execute("SELECT * FROM job_tags WHERE guild_id = %s", (guild.parent.id,))
-        data = c.fetchall()
+        sources = {c for c in source_ids if await resolver.channel(c) is not None}
+        destinations = {c for c in post_ids if await resolver.channel(c) is not None}
 
         tags = []
-        roles = []
 
-        for group in data:
-            channel_id = group[1]
-            role_list = group[2]
-            tag_id = group[3]
+        for group in records.tags:
+            channel_id = group["channel_id"]
+            role_list = group["role_ids"]
+            tag_id = group["tag_id"]
 
-            try:
-                parent = await guild.parent.fetch_channel(channel_id)
-            except:
+            parent = await resolver.channel(channel_id)
+            if parent is None or parent.type is not ChannelType.forum:
                 continue
 
-            found = False
-            for tag in parent.available_tags:
-                if tag.id == tag_id:
-                    found = True
-                    break
-
-            if not found:
+            if parent.get_tag(tag_id) is None:  # type: ignore
                 continue
 
-            for role_id in [int(r) for r in convert_database_list(role_list)]:
-                role = await guild.parent._fetch_role(role_id)
-                if role is None:
-                    continue
-                roles.append(role)
+            roles = array("Q")
+            for role_id in role_list or ():
+                if await resolver.role(role_id) is not None:
+                    roles.append(role_id)
 
             if not roles:
                 continue
 
-            job_tag = JobTag(parent, tag, roles)
-            tags.append(job_tag)
-            roles = []
+            tags.append(JobTag(channel_id, tag_id, roles))
 
-        c.execute("SELECT * FROM job_stats WHERE guild_id = %s", (guild.parent.id, ))
-        stat_records = c.fetchall()
-        c.close()
+        stat_records = records.stats
 
         job_stats: Dict[int, int] = {}
         for stat in stat_records:
-            job_stats[stat[0]] = stat[2]
+            job_stats[stat["role_id"]] = stat["count"]
 
         return cls(
             guild=guild,
-            source_channels=source_channels,
-            post_channels=post_channels,
+            source_ids=sources,
+            post_ids=destinations,
             tags=tags,
             stats=job_stats
         )
 
+####################################################################################################
+    @classmethod
+    def from_snapshot(cls: Type[JobPostings], guild: GuildData, data: Dict[str, Any]) -> JobPostings:
+        """Builds the guild's job posting data from a config snapshot without
+        touching the database. Routes are compiled from the gateway cache as usual,
+        so the result is only as fresh as the snapshot until the guild is reloaded.
+        """
+
+        return cls(
+            guild=guild,
+            source_ids=set(data["sources"]),
+            post_ids=set(data["destinations"]),
+            tags=[
+                JobTag(channel_id, tag_id, array("Q", role_ids))
+                for channel_id, tag_id, role_ids in data["tags"]
+            ],
+            stats={int(role_id): count for role_id, count in data["stats"].items()}
+        )
+
+####################################################################################################
+    def to_snapshot(self) -> Dict[str, Any]:
+        """Returns this config as plain JSON-serializable data for :meth:`from_snapshot`."""
+
+        return {
+            "sources": sorted(self.source_ids),
+            "destinations": sorted(self.post_ids),
+            "tags": [[tag.channel_id, tag.tag_id, list(tag.role_ids)] for tag in self.tags],
+            "stats": {str(role_id): count for role_id, count in self.stats.items()}
+        }
+
 ####################################################################################################
     def all_channels(self) -> List[GuildChannel]:
 
-        return self.post_channels + self.post_channels
+        return self.source_channels + self.post_channels
 
 ####################################################################################################
     def status_all(self) -> Embed:
@@ -276,6 +495,7 @@ class JobPostings:
             EmbedField("__Source Channel(s)__", self.list_sources(), True),
             EmbedField("__Post Channel(s)__", self.list_destinations(), True),
             SeparatorField(6),
+            EmbedField("__Deliveries Since Startup__", self.delivery_stats(), False),
             # EmbedField("__Posting Stats__", self.posting_stats(), False),
             # SeparatorField(6),
         ]
@@ -285,11 +505,51 @@ class JobPostings:
             fields=fields
         )
 
+####################################################################################################
+    async def activity_stats(self) -> Embed:
+        """Summarises the last seven days of crossposts, read from the rollup tables."""
+
+        now = datetime.now(timezone.utc)
+        since = now - timedelta(days=6)
+
+        tags = await db.fetch_crosspost_totals(self.guild.parent.id, "tag", since.date())
+        roles = await db.fetch_crosspost_totals(self.guild.parent.id, "role", since.date())
+        hours = await db.fetch_crosspost_hours(
+            self.guild.parent.id, since.replace(hour=0, minute=0, second=0, microsecond=0, tzinfo=None)
+        )
+
+        tag_text = ""
+        for row in tags[:10]:
+            channel = self.guild.parent.get_channel(self._tag_channels.get(row["dim_id"], 0))
+            tag = channel.get_tag(row["dim_id"]) if channel is not None else None  # type: ignore
+            tag_text += f"- {tag.name if tag else row['dim_id']} -- {row['posts']}x Posts\n"
+
+        role_text = "".join(
+            f"- <@&{row['dim_id']}> -- {row['posts']}x Posts\n" for row in roles[:10]
+        )
+
+        hour_text = "".join(
+            f"- {row['hour']:02d}:00 UTC -- {row['posts']}x Posts\n" for row in hours[:3]
+        )
+
+        fields = [
+            EmbedField("__Top Tags__", tag_text or "`No Posts Yet`", True),
+            EmbedField("__Top Roles__", role_text or "`No Posts Yet`", True),
+            SeparatorField(6),
+            EmbedField("__Busiest Hours__", hour_text or "`No Posts Yet`", False)
+        ]
+
+        return make_embed(
+            title="Job Crossposting Activity (Last 7 Days)",
+            description="*Recent posts may take a few minutes to show up.*",
+            fields=fields
+        )
+
 ####################################################################################################
     def posting_stats(self) -> str:
 
         ret = ""
-        for key, value in self.stats:
+        for key, value in self.stats.items():
             role = self.guild.parent.get_role(key)
             if role is None:
                 continue
@@ -301,6 +561,29 @@ class JobPostings:
 
         return ret
 
+####################################################################################################
+    def delivery_stats(self) -> str:
+        """Summarizes the crosspost sends to each current destination since the bot started."""
+
+        ret = ""
+        for channel_id in sorted(self.post_ids):
+            stats = self.deliveries.get(channel_id)
+            if stats is None:
+                continue
+
+            ret += (
+                f"- <#{channel_id}> -- {stats.sends} sent, {stats.failures} failed, "
+                f"{stats.average_latency * 1000:.0f}ms avg\n"
+            )
+            if stats.last_error is not None:
+                ret += f"  - Last error: `{stats.last_error[:100]}`\n"
+
+        if not ret:
+            ret = "`No Crossposts Sent Yet`"
+
+        # Embed field values are capped at 1024 characters.
+        return ret[:1024]
+
 ####################################################################################################
     def source_channel_status(self) -> Embed:
 
@@ -328,13 +611,13 @@ class JobPostings:
         self, interaction: Interaction, channel: ForumChannel
     ) -> None:
 
-        if channel not in self.source_channels:
-            self.update(source_channel=channel)
+        if channel.id not in self.source_ids:
+            await self.update(source_channel=channel)
 
         status = self.source_channel_status()
         # view = CloseMessageView(interaction.user)
 
-        await interaction.response.send_message(embed=status)#, view=view)
+        await respond(interaction, embed=status)#, view=view)
         # await view.wait()
 
         return
@@ -344,13 +627,13 @@ class JobPostings:
             self, interaction: Interaction, channel: TextChannel
     ) -> None:
 
-        if channel not in self.post_channels:
-            self.update(post_channel=channel)
+        if channel.id not in self.post_ids:
+            await self.update(post_channel=channel)
 
         status = self.post_channel_status()
         # view = CloseMessageView(interaction.user)
 
-        await interaction.response.send_message(embed=status)#, view=view)
+        await respond(interaction, embed=status)#, view=view)
         # await view.wait()
 
         return
@@ -358,13 +641,13 @@ class JobPostings:
 ####################################################################################################
     async def remove_source(self, interaction: Interaction, channel: ForumChannel) -> None:
 
-        if channel in self.source_channels:
-            self.update(remove_channel=channel)
+        if channel.id in self.source_ids:
+            await self.update(remove_channel=channel)
 
         status = self.source_channel_status()
         # view = CloseMessageView(interaction.user)
 
-        await interaction.response.send_message(embed=status)#, view=view)
+        await respond(interaction, embed=status)#, view=view)
         # await view.wait()
 
         return
@@ -372,13 +655,13 @@ class JobPostings:
 ####################################################################################################
     async def remove_destination(self, interaction: Interaction, channel: TextChannel) -> None:
 
-        if channel in self.post_channels:
-            self.update(remove_channel=channel)
+        if channel.id in self.post_ids:
+            await self.update(remove_channel=channel)
 
         status = self.post_channel_status()
         # view = CloseMessageView(interaction.user)
 
-        await interaction.response.send_message(embed=status)#, view=view)
+        await respond(interaction, embed=status)#, view=view)
         # await view.wait()
 
         return
@@ -386,9 +669,9 @@ class JobPostings:
 ####################################################################################################
     def list_sources(self) -> str:
 
-        if self.source_channels:
+        if self.source_ids:
             current_sources = "\n- ".join(
-                [c.mention for c in self.source_channels]
+                [f"<#{c}>" for c in sorted(self.source_ids)]
             )
             return f"- {current_sources}"
 
@@ -397,9 +680,9 @@ class JobPostings:
 ####################################################################################################
     def list_destinations(self) -> str:
 
-        if self.post_channels:
+        if self.post_ids:
             post_channels = "\n- ".join(
-                [ch.mention for ch in self.post_channels]
+                [f"<#{ch}>" for ch in sorted(self.post_ids)]
             )
             return f"- {post_channels}"
 
@@ -408,22 +691,19 @@ class JobPostings:
 ####################################################################################################
     def get_tag_parent_channels(self, tag_name: str) -> List[ForumChannel]:
 
-        channels = []
-        for channel in self.source_channels:
-            for tag in channel.available_tags:
-                if tag.name.lower() == tag_name.lower():
-                    channels.append(channel)
-
-        return channels
+        return self._resolve_channels(
+            channel_id for channel_id, _ in self._tag_names.get(tag_name.casefold(), ())
+        )  # type: ignore
 
 ####################################################################################################
     def get_parent_tags(self, tag_string: str) -> List[ForumTag]:
 
         tags = []
-        for channel in self.source_channels:
-            for tag in channel.available_tags:
-                if tag.name.lower() == tag_string.lower():
-                    tags.append(tag)
+        for channel_id, tag_id in self._tag_names.get(tag_string.casefold(), ()):
+            channel = self.guild.parent.get_channel(channel_id)
+            tag = channel.get_tag(tag_id) if channel is not None else None  # type: ignore
+            if tag is not None:
+                tags.append(tag)
 
         return tags
 
@@ -435,15 +715,12 @@ class JobPostings:
         to the given tag as well as a list of tags the role is currently mapped to.
         """
 
-        found = False
-        tags = []
+        tags = self.tags_for_role(role.id)
 
-        for tag in self.tags:
-            if role in tag.roles:
-                found = True
-                tags.append(tag)
-                # if query_tag is not None and tag.parent.id == query_tag.id:
-                #     found = True
+        if query_tag is None:
+            found = bool(tags)
+        else:
+            found = any(tag.tag_id == query_tag.id for tag in tags)
 
         return found, tags
 
@@ -454,10 +731,14 @@ class JobPostings:
         status = f"{role.mention} is linked to the following tags:\n\n"
 
         for tag in tags:
-            tag_emoji = str(tag.parent.emoji) if str(tag.parent.emoji) != "_" else ""
+            parent = tag.tag(self.guild.parent)
+            if parent is None:
+                continue
+
+            tag_emoji = str(parent.emoji) if str(parent.emoji) != "_" else ""
             status += (
-                f"{tag_emoji} {tag.parent.name} "
-                f"({tag.channel.mention})\n"
+                f"{tag_emoji} {parent.name} "
+                f"(<#{tag.channel_id}>)\n"
             )
 
         return status
@@ -469,7 +750,8 @@ class JobPostings:
 
         description = f"The role {role.mention} is already linked to the following forum tags:\n"
         for t in tags:
-            description += f"- {t.parent.name} ({t.channel.mention})\n"
+            parent = t.tag(self.guild.parent)
+            description += f"- {parent.name if parent else t.tag_id} (<#{t.channel_id}>)\n"
 
         return make_embed(
             title="Tag/Role Combination Already Mapped",
@@ -478,29 +760,28 @@ class JobPostings:
         )
 
 ####################################################################################################
-    def map_tags(self, tags: List[ForumTag], role: Role) -> None:
+    async def map_tags(self, tags: List[ForumTag], role: Role) -> None:
+        """Maps the role to every given tag. Only the new pairs are sent to the
+        database, all in one statement."""
 
-        for tag in tags:
-            map_check, _ = self.check_for_role_mapping(role, tag)
+        # If the check is `true`, the pair was found and doesn't need to be created.
+        unmapped = [tag for tag in tags if not self.check_for_role_mapping(role, tag)[0]]
+        keys = [(self._tag_channels[tag.id], tag.id) for tag in unmapped]
 
-            # If map_check is `true`, it means the pair was found and doesn't need to be created.
-            if map_check:
-                continue
+        async with self._config_write():
+            await db.add_job_tag_role(self.guild.parent.id, role.id, keys)
 
-            flag = False
-            for t in self.tags:
-                if t.parent.id == tag.id:
-                    flag = True
-                    t.update(role=role)
-
-            if not flag:
-                new_tag = JobTag.new(
-                    guild_id=self.guild.parent.id,
-                    channel=self.get_tag_parent_channels(tag.name)[0],
-                    parent=tag,
-                    role=role
-                )
-                self.tags.append(new_tag)
+            existing = {t.tag_id: t for t in self.tags}
+            for channel_id, tag_id in keys:
+                job_tag = existing.get(tag_id)
+                if job_tag is None:
+                    job_tag = JobTag(channel_id, tag_id, array("Q"))
+                    self.tags.append(job_tag)
+
+                job_tag.add_role(role.id)
+                self._index_role(job_tag, role.id)
+
+            self.refresh_routes(tag.name for tag in tags)
 
         return
 
@@ -512,18 +793,19 @@ class JobPostings:
         parent_role: Role
     ) -> None:
 
-        # if we're at this point, tags were already successfully found, therefore,
+        # If we're at this point, the mapping was already successfully found, therefore,
         # we won't get a null reference error here.
-        for parent in parent_tags:
-            for tag in self.tags:
-                if tag.parent.id == parent.id:
-                    parent_channel = tag.channel
+        parents = {parent.id: parent for parent in parent_tags}
+        mapped = [t for t in self.tags_for_role(parent_role.id) if t.tag_id in parents]
+
+        tag = mapped[0]
+        parent = parents[tag.tag_id]
 
         confirm = make_embed(
             color=Colour.red(),
             title="Mapping Already Present",
             description=(
-                f"The forum tag {parent.name} (in channel {parent_channel.mention})\n"
+                f"The forum tag {parent.name} (in channel <#{tag.channel_id}>)\n"
                 f"is already linked to the role {parent_role.mention}.\n\n"
 
                 "**Do you want to __remove__ that mapping?**"
@@ -532,20 +814,20 @@ class JobPostings:
         )
         view = ConfirmCancelView(interaction.user)
 
-        await interaction.response.send_message(embed=confirm, view=view)
+        await respond(interaction, embed=confirm, view=view)
         await view.wait()
 
         if view.value is None or view.value is False:
             return
 
-        tag.remove_role(parent_role)
-        self.clean_up_tags()
+        await self.unmap_role(parent_role.id, mapped)
+        self.refresh_routes(p.name for p in parent_tags)
 
         success = make_embed(
             color=Colour.green(),
             title="Success!",
             description=(
-                f"The forum tag {tag.parent.name} (in channel {parent_channel.mention})\n"
+                f"The forum tag {parent.name} (in channel <#{tag.channel_id}>)\n"
                 f"is no longer linked to the role {parent_role.mention}.\n\n"
             ),
             timestamp=True
@@ -576,16 +858,20 @@ class JobPostings:
         tag_text = emoji_text = role_text = ""
 
         for tag in self.tags:
-            emoji = tag.parent.emoji if str(tag.parent.emoji) != "_" else ""
-            tag_text += f"{emoji} {tag.parent.name}\n"
+            parent = tag.tag(self.guild.parent)
+            if parent is None:
+                continue
+
+            emoji = parent.emoji if str(parent.emoji) != "_" else ""
+            tag_text += f"{emoji} {parent.name}\n"
             emoji_text += f"{BotEmojis.RightArrow}\n"
-            role_text += f"{tag.roles[0].mention}\n"
+            role_text += f"<@&{tag.role_ids[0]}>\n"
 
-            if len(tag.roles) > 1:
-                for role in tag.roles[1:]:
+            if len(tag.role_ids) > 1:
+                for role_id in tag.role_ids[1:]:
                     tag_text += "\n"
                     emoji_text += "\n"
-                    role_text += f"{role.mention}\n"
+                    role_text += f"<@&{role_id}>\n"
 
         fields = [
             EmbedField("__Tag__", tag_text, True),
@@ -600,105 +886,189 @@ class JobPostings:
         )
 
 ####################################################################################################
-    def role_removed(self, role: Role) -> None:
+    async def role_removed(self, role: Role) -> None:
 
-        for tag in self.tags:
-            for i, r in enumerate(tag.roles):
-                if r.id == role.id:
-                    tag.roles.pop(i)
+        mapped = self.tags_for_role(role.id)
+        names = [role.name] + [self._tag_keys.get(tag.tag_id, "") for tag in mapped]
+
+        await self.unmap_role(role.id, mapped)
+        self.refresh_routes(names)
+
+####################################################################################################
+    async def unmap_role(self, role_id: int, tags: List[JobTag]) -> None:
+        """Removes the role from each of the given tags with one database statement.
+        Tags left without roles are deleted by that same statement and dropped here.
+
+        Tags are matched by key rather than identity, since a reload may have
+        replaced them while the caller was waiting."""
+
+        keys = {(t.channel_id, t.tag_id) for t in tags}
+
+        async with self._config_write():
+            await db.remove_job_tag_role(self.guild.parent.id, role_id, sorted(keys))
+
+            for tag in self.tags:
+                if (tag.channel_id, tag.tag_id) in keys:
+                    tag.remove_role(role_id)
+                    self._unindex_role(tag, role_id)
+
+            self.tags = [tag for tag in self.tags if tag.role_ids]
+
+####################################################################################################
+    def update_stats(self, role_id: int) -> None:
+        """Counts a crosspost for the given role. The database write is
+        batched by :data:`stats_buffer` and happens off the crosspost path."""
 
-                    if not tag.roles:
-                        tag.delete()
+        self.stats[role_id] = self.stats.get(role_id, 0) + 1
+        stats_buffer.add(self.guild.parent.id, role_id)
 
-        self.clean_up_tags()
+        return
+
+####################################################################################################
+    def record_crosspost(self, thread: Thread, role_ids: Iterable[int]) -> None:
+        """Appends the crosspost to the event log. The write is batched by
+        :data:`crosspost_log`, off the crosspost path."""
+
+        crosspost_log.record(
+            self.guild.parent.id,
+            thread.id,
+            thread.parent_id,
+            [tag.id for tag in thread.applied_tags],
+            role_ids,
+            thread.created_at or datetime.now(timezone.utc)
+        )
 
 ####################################################################################################
-    def clean_up_tags(self) -> None:
+    async def forum_tags_changed(self, channel: ForumChannel) -> None:
+        """Drops mappings for tags no longer available in ``channel``, then
+        refreshes the tag name index and routing table after a forum edit."""
+
+        remaining = {t.id for t in channel.available_tags}
+        dropped = [
+            t for t in self.tags
+            if t.channel_id == channel.id and t.tag_id not in remaining
+        ]
+
+        async with self._config_write():
+            if dropped:
+                await db.delete_job_tags(self.guild.parent.id, channel.id, keep=sorted(remaining))
+
+            self.tags = [
+                t for t in self.tags
+                if t.channel_id != channel.id or t.tag_id in remaining
+            ]
 
-        for i, tag in enumerate(self.tags):
-            print(tag.parent.name)
-            print(tag.roles)
-            if not tag.roles:
-                tag.delete()
-                self.tags.pop(i)
+            self.reindex_roles()
+            self.reindex_tag_names()
+            self.refresh_routes()
 
 ####################################################################################################
-    def update_stats(self, role: Role) -> None:
+    async def send_to_destinations(self, content: str) -> None:
+        """Sends ``content`` to every post channel concurrently.
 
-        c = db_connection.cursor()
+        At most ``CROSSPOST_CONCURRENCY`` (default ``5``) sends are in flight at once.
+        Each destination succeeds or fails on its own, so a slow or forbidden channel
+        doesn't hold up or abort the rest. Outcomes are recorded in :attr:`deliveries`.
+        """
 
-        if role.id not in self.stats.keys():
-            self.stats[role.id] = 1
-            c.execute(
-                "INSERT INTO job_stats (role_id, guild_id, count) VALUES (%s, %s, %s)",
-                (role.id, self.guild.parent.id, 1)
-            )
-        else:
-            self.stats[role.id] += 1
-            c.execute(
-                "UPDATE job_stats SET count = %s WHERE role_id = %s",
-                (self.stats[role.id], role.id)
-            )
+        semaphore = asyncio.Semaphore(int(os.environ.get("CROSSPOST_CONCURRENCY", 5)))
 
-        db_connection.commit()
-        c.close()
+        async def deliver(channel_id: int) -> None:
+            stats = self.deliveries.setdefault(channel_id, DeliveryStats())
 
-        return
+            channel = self.guild.parent.get_channel(channel_id)
+            if channel is None:
+                stats.failures += 1
+                stats.last_error = "Channel not found"
+                return
+
+            async with semaphore:
+                start = time.perf_counter()
+                try:
+                    await channel.send(content)  # type: ignore
+                except Exception as error:
+                    stats.failures += 1
+                    stats.last_error = repr(error)
+                    print(f"Crosspost to #{channel.name} ({channel_id}) failed: {error!r}")
+                else:
+                    stats.sends += 1
+                    stats.total_latency += time.perf_counter() - start
+
+        await asyncio.gather(*(deliver(channel_id) for channel_id in list(self.post_ids)))
 
 ####################################################################################################
-    def yeet_channel(self, channel: ForumChannel) -> None:
+    async def yeet_channel(self, channel: ForumChannel) -> None:
+        """Forgets a deleted channel, along with every mapping in it if it was a
+        forum. The database changes are committed as one transaction, and memory
+        is only updated once that succeeds."""
+
+        configured = channel.id in self.source_ids or channel.id in self.post_ids
+        has_tags = any(tag.channel_id == channel.id for tag in self.tags)
+
+        # Most deleted channels were never part of the config; don't write or notify for them.
+        if not configured and not has_tags:
+            return
+
+        async with self._config_write():
+            source_ids = self.source_ids - {channel.id}
+            post_ids = self.post_ids - {channel.id}
+
+            async with db.transaction() as uow:
+                if has_tags:
+                    await db.delete_job_tags(self.guild.parent.id, channel.id, uow=uow)
 
-        if channel.type is ChannelType.text:
-            for i, ch in enumerate(self.post_channels):
-                if ch.id == channel.id:
-                    self.post_channels.pop(i)
-                    break
+                if configured:
+                    await db.update_job_postings(
+                        self.guild.parent.id, sorted(source_ids), sorted(post_ids), uow=uow
+                    )
 
-        elif channel.type is ChannelType.forum:
-            for i, ch in enumerate(self.source_channels):
-                if ch.id == channel.id:
-                    self.source_channels.pop(i)
-                    break
+            was_source = channel.id in self.source_ids
+            self.source_ids = source_ids
+            self.post_ids = post_ids
 
-            for i, tag in enumerate(self.tags):
-                if tag.parent.id == channel.id:
-                    tag.delete()
-                    self.tags.pop(i)
+            if has_tags:
+                self.tags = [tag for tag in self.tags if tag.channel_id != channel.id]
+                self.reindex_roles()
 
-        self.update()
+            # A source forum's tags are indexed whether or not any of them are mapped.
+            if has_tags or was_source:
+                self.reindex_tag_names()
+
+            self.refresh_routes()
 
 ####################################################################################################
-    def update(
+    async def update(
         self,
         source_channel: Optional[ForumChannel] = None,
         post_channel: Optional[TextChannel] = None,
         remove_channel: Optional[Union[ForumChannel, TextChannel]] = None
     ) -> None:
 
+        source_ids = set(self.source_ids)
+        post_ids = set(self.post_ids)
+
         if source_channel is not None:
-            self.source_channels.append(source_channel)
+            source_ids.add(source_channel.id)
         if post_channel is not None:
-            self.post_channels.append(post_channel)
+            post_ids.add(post_channel.id)
         if remove_channel is not None:
-            if remove_channel in self.source_channels:
-                self.source_channels.remove(remove_channel)
-            elif remove_channel in self.post_channels:
-                self.post_channels.remove(remove_channel)
+            if remove_channel.id in source_ids:
+                source_ids.remove(remove_channel.id)
+            elif remove_channel.id in post_ids:
+                post_ids.remove(remove_channel.id)
             else:
                 return
 
-        source_ids = [channel.id for channel in self.source_channels]
-        post_ids = [channel.id for channel in self.post_channels]
+        # Memory only changes once the write has gone through.
+        async with self._config_write():
+            await db.update_job_postings(self.guild.parent.id, sorted(source_ids), sorted(post_ids))
 
-        c = db_connection.cursor()
-        c.execute(
-            "UPDATE job_postings SET sources = %s, destinations = %s "
-            "WHERE guild_id = %s",
-            (source_ids, post_ids, self.guild.parent.id)
-        )
+            self.source_ids = source_ids
+            self.post_ids = post_ids
 
-        db_connection.commit()
-        c.close()
+            if source_channel is not None or remove_channel is not None:
+                self.reindex_tag_names()
+                self.refresh_routes()
 
         return
 
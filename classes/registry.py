@@ -0,0 +1,143 @@
+from __future__ import annotations
+
+import asyncio
+
+from discord    import Guild
+from typing     import TYPE_CHECKING, Awaitable, Callable, Dict, Iterable, Iterator, List, Optional
+
+if TYPE_CHECKING:
+    from classes.guild  import GuildData
+####################################################################################################
+
+__all__ = ("GuildRegistry", )
+
+####################################################################################################
+class GuildRegistry:
+    """An ID-keyed collection of all :class:`GuildData` objects loaded by the bot.
+
+    Lookups, insertions and removals are all constant time.
+
+    Guilds can also be *deferred*: known to have config, but not loaded until
+    something first needs them through :meth:`ensure`. Container methods and
+    :meth:`get` only ever see loaded guilds.
+    """
+
+    __slots__ = (
+        "_guilds",
+        "_deferred",
+        "_pending",
+        "loader"
+    )
+
+####################################################################################################
+    def __init__(self):
+
+        self._guilds: Dict[int, GuildData] = {}
+        self._deferred: Dict[int, Guild] = {}
+        self._pending: Dict[int, asyncio.Task] = {}
+
+        # Loads a batch of deferred guilds, adding each to the registry once ready.
+        self.loader: Optional[Callable[[List[Guild]], Awaitable[None]]] = None
+
+####################################################################################################
+    def __contains__(self, guild_id: int) -> bool:
+
+        return guild_id in self._guilds
+
+####################################################################################################
+    def __iter__(self) -> Iterator[GuildData]:
+
+        return iter(list(self._guilds.values()))
+
+####################################################################################################
+    def __len__(self) -> int:
+
+        return len(self._guilds)
+
+####################################################################################################
+    def get(self, guild_id: int) -> Optional[GuildData]:
+        """Returns the loaded data for the given guild ID, or ``None`` if it isn't loaded."""
+
+        return self._guilds.get(guild_id)
+
+####################################################################################################
+    def add(self, guild: GuildData) -> None:
+        """Adds (or replaces) the data for a guild."""
+
+        self._deferred.pop(guild.parent.id, None)
+        self._guilds[guild.parent.id] = guild
+
+####################################################################################################
+    def remove(self, guild_id: int) -> Optional[GuildData]:
+        """Removes and returns the data for a guild, if it was loaded.
+        A deferred guild is forgotten as well."""
+
+        self._deferred.pop(guild_id, None)
+        return self._guilds.pop(guild_id, None)
+
+####################################################################################################
+    def defer(self, guild: Guild) -> None:
+        """Registers a guild to be loaded on first use instead of now."""
+
+        if guild.id not in self._guilds:
+            self._deferred[guild.id] = guild
+
+####################################################################################################
+    def is_deferred(self, guild_id: int) -> bool:
+
+        return guild_id in self._deferred
+
+####################################################################################################
+    @property
+    def deferred(self) -> List[Guild]:
+        """The guilds registered to load on first use and not loaded yet."""
+
+        return list(self._deferred.values())
+
+####################################################################################################
+    async def ensure(self, guild_id: int) -> Optional[GuildData]:
+        """Returns the data for the given guild, loading it first if it's deferred.
+        Returns ``None`` if the guild is unknown or its load failed."""
+
+        data = self._guilds.get(guild_id)
+        if data is not None or guild_id not in self._deferred:
+            return data
+
+        await self.ensure_many([guild_id])
+        return self._guilds.get(guild_id)
+
+####################################################################################################
+    async def ensure_many(self, guild_ids: Iterable[int]) -> None:
+        """Loads every given deferred guild, sharing one batch load between them.
+        Callers asking for a guild that's already loading wait on that load instead."""
+
+        if self.loader is None:
+            return
+
+        guild_ids = list(guild_ids)
+        batch = [
+            self._deferred[guild_id] for guild_id in guild_ids
+            if guild_id in self._deferred and guild_id not in self._pending
+        ]
+
+        if batch:
+            task = asyncio.create_task(self.loader(batch))
+            for guild in batch:
+                self._pending[guild.id] = task
+
+            def finished(done: asyncio.Task) -> None:
+                for guild in batch:
+                    self._pending.pop(guild.id, None)
+
+                # Reported once here, since every waiter below discards it.
+                if not done.cancelled() and done.exception() is not None:
+                    print(f"Failed loading {len(batch)} deferred guild(s) ({done.exception()!r})")
+
+            task.add_done_callback(finished)
+
+        waiting = {self._pending[i] for i in guild_ids if i in self._pending}
+        if waiting:
+            # Shielded so one impatient caller can't cancel a load others are waiting on.
+            await asyncio.shield(asyncio.gather(*waiting, return_exceptions=True))
+
+####################################################################################################
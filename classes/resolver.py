@@ -0,0 +1,91 @@
+from __future__ import annotations
+
+from discord.abc    import GuildChannel
+from discord        import Guild, HTTPException, Role
+from typing         import Dict, Optional
+
+####################################################################################################
+
+__all__ = ("GuildResolver", )
+
+####################################################################################################
+class GuildResolver:
+    """Resolves channel and role IDs to live objects for a single guild.
+
+    Lookups hit the gateway cache first and are memoised, so repeated IDs cost
+    nothing. Anything missing from the cache triggers at most one bulk
+    ``fetch_channels`` and one ``fetch_roles`` call for the lifetime of the
+    resolver, instead of one REST request per ID.
+
+    Attributes:
+    -----------
+    guild: :class:`discord.Guild`
+        The guild whose channels and roles are being resolved.
+    """
+
+    __slots__ = (
+        "guild",
+        "_channels",
+        "_roles",
+        "_channels_fetched",
+        "_roles_fetched"
+    )
+
+####################################################################################################
+    def __init__(self, guild: Guild):
+
+        self.guild: Guild = guild
+
+        self._channels: Dict[int, Optional[GuildChannel]] = {}
+        self._roles: Dict[int, Optional[Role]] = {}
+
+        self._channels_fetched: bool = False
+        self._roles_fetched: bool = False
+
+####################################################################################################
+    async def channel(self, channel_id: int) -> Optional[GuildChannel]:
+        """Returns the guild channel with the given ID, or ``None`` if it no longer exists."""
+
+        if channel_id in self._channels:
+            return self._channels[channel_id]
+
+        channel = self.guild.get_channel(channel_id)
+        if channel is None and not self._channels_fetched:
+            self._channels_fetched = True
+            try:
+                fetched = await self.guild.fetch_channels()
+            except HTTPException:
+                fetched = []
+
+            for c in fetched:
+                self._channels.setdefault(c.id, c)
+
+            channel = self._channels.get(channel_id)
+
+        self._channels[channel_id] = channel
+        return channel
+
+####################################################################################################
+    async def role(self, role_id: int) -> Optional[Role]:
+        """Returns the guild role with the given ID, or ``None`` if it no longer exists."""
+
+        if role_id in self._roles:
+            return self._roles[role_id]
+
+        role = self.guild.get_role(role_id)
+        if role is None and not self._roles_fetched:
+            self._roles_fetched = True
+            try:
+                fetched = await self.guild.fetch_roles()
+            except HTTPException:
+                fetched = []
+
+            for r in fetched:
+                self._roles.setdefault(r.id, r)
+
+            role = self._roles.get(role_id)
+
+        self._roles[role_id] = role
+        return role
+
+####################################################################################################
@@ -1,37 +1,498 @@
 from __future__ import annotations
 
-from discord    import Cog
-from typing     import TYPE_CHECKING
+import asyncio
+import math
+import os
+import time
+
+from discord    import (
+    ApplicationContext,
+    Cog,
+    Guild,
+    option,
+    SlashCommandGroup
+)
+from typing     import TYPE_CHECKING, Dict, List, Optional, Set
 
 from classes.guild  import GuildData
-from utilities      import assert_database_entries
+from utilities      import boot_profiler, config_snapshot, db, GuildRecords, make_embed
 
 if TYPE_CHECKING:
     from classes.bot    import KinoKi
 ####################################################################################################
 class Internal(Cog):
+    """Internal bot housekeeping: loading guild data on startup, keeping it in
+    step with guild membership afterwards, and reloading it on config changes.
+
+    Guilds delivered before ``on_ready`` are served from the config snapshot
+    straight away, where it has an entry for them, and reloaded from the
+    database in the background once the bot is ready.
+
+    Environment Variables:
+    ----------------------
+    GUILD_LOAD_CONCURRENCY:
+        Maximum number of guilds loaded at the same time. Defaults to ``8``.
+
+    GUILD_LOAD_TIMEOUT:
+        Seconds a single guild may take to load before it's skipped. Defaults to ``60``.
+
+    GUILD_RELOAD_DELAY:
+        Seconds to wait after a config change notification before reloading the
+        guild, so a burst of changes costs one reload. Defaults to ``1``.
+
+    GUILD_LOAD_MODE:
+        ``lazy`` (default) loads a guild's config on first use, after one bulk
+        query has ruled out the guilds with none. ``eager`` loads every guild at startup.
+
+    GUILD_WARM_SIZE / GUILD_WARM_DAYS:
+        In lazy mode, up to ``GUILD_WARM_SIZE`` (default ``25``) guilds with the
+        most crossposts over the last ``GUILD_WARM_DAYS`` (default ``7``) days
+        are loaded at startup anyway.
+    """
 
     def __init__(self, bot: KinoKi):
 
         self.bot: KinoKi = bot
 
+        self._listening: bool = False
+        self._started: bool = False
+        self._reloads: Dict[int, asyncio.Task] = {}
+        self._loading: Set[int] = set()
+        self._restored: Set[int] = set()
+        self._reconcile_task: Optional[asyncio.Task] = None
+        self._resync_task: Optional[asyncio.Task] = None
+
+        self.bot.k_guilds.loader = self.load_batch
+
+####################################################################################################
+
+    internal = SlashCommandGroup(
+        name="internal",
+        description="Bot owner diagnostics"
+    )
+
 ####################################################################################################
     @Cog.listener("on_ready")
     async def load_guilds(self):
-        """Loads all special bot config data for each guild."""
+        """Brings the loaded guild data in line with the bot's current guilds.
+
+        ``on_ready`` fires again whenever the gateway session is re-established, so
+        only the difference is applied: guilds not loaded yet are loaded, guilds no
+        longer joined are evicted, and the rest are rebound to the fresh
+        :class:`Guild` objects without touching the database.
+        """
+
+        if not self._started:
+            boot_profiler.end("gateway")
+            boot_profiler.begin("load_guilds")
+            boot_profiler.profile_start()
+
+        self._started = True
+
+        # Subscribe before reading anything, so no change made during the load is missed.
+        if not self._listening:
+            await db.listen("guild_config", self.config_changed)
+            self._listening = True
+
+        current = {guild.id: guild for guild in self.bot.guilds}
+
+        for guild_data in self.bot.k_guilds:
+            guild = current.get(guild_data.parent.id)
+            if guild is None:
+                self.evict(guild_data.parent.id)
+            elif guild is not guild_data.parent:
+                guild_data.rebind(guild)
+
+        for stale in self.bot.k_guilds.deferred:
+            guild = current.get(stale.id)
+            if guild is None:
+                self.evict(stale.id)
+            else:
+                self.bot.k_guilds.defer(guild)
+
+        with boot_profiler.phase("admit"):
+            await self.admit([
+                g for g in current.values()
+                if g.id not in self.bot.k_guilds and not self.bot.k_guilds.is_deferred(g.id)
+            ])
+
+        if self._restored:
+            restored, self._restored = list(self._restored), set()
+            self._reconcile_task = asyncio.create_task(self.reconcile(restored))
+
+        # Only now is the guild list complete enough to drop guilds from the snapshot.
+        config_snapshot.settle()
+        await config_snapshot.write()
+
+        boot_profiler.end("load_guilds")
+        boot_profiler.finish()
+
+####################################################################################################
+    @Cog.listener("on_guild_join")
+    async def guild_joined(self, guild: Guild) -> None:
+
+        if not self._started:
+            self.restore(guild)
+            return
+
+        await self.admit([guild])
+
+####################################################################################################
+    @Cog.listener("on_guild_available")
+    async def guild_available(self, guild: Guild) -> None:
+        """Loads a guild that was unavailable during startup once Discord delivers it."""
 
-        for guild in self.bot.guilds:
-            print("========================================")
-            print(f"Loading: {guild.name} || ID: {guild.id}")
+        # Guilds delivered with the initial READY are loaded together by `load_guilds`.
+        if not self._started:
+            self.restore(guild)
+            return
 
-            assert_database_entries(guild.id)
+        if self.bot.k_guilds.is_deferred(guild.id):
+            self.bot.k_guilds.defer(guild)
+            return
+
+        guild_data = self.bot.k_guilds.get(guild.id)
+        if guild_data is None:
+            await self.admit([guild])
+        elif guild_data.parent is not guild:
+            guild_data.rebind(guild)
+
+####################################################################################################
+    def restore(self, guild: Guild) -> None:
+        """Registers a guild from the config snapshot, if it has an entry for it, so
+        its threads are crossposted before the database has been read."""
+
+        data = config_snapshot.get(guild.id)
+        if data is None or guild.id in self.bot.k_guilds:
+            return
+
+        guild_data = GuildData(parent=guild)
+        try:
+            guild_data.restore(data)
+        except (KeyError, TypeError, ValueError) as error:
+            print(f"Ignoring snapshot of: {guild.name} || ID: {guild.id} ({error!r})")
+            return
+
+        self.bot.k_guilds.add(guild_data)
+        self._restored.add(guild.id)
+
+####################################################################################################
+    async def reconcile(self, guild_ids: List[int]) -> None:
+        """Reloads guilds restored from the config snapshot from the database, which
+        remains the source of truth. A guild that fails keeps its snapshot config."""
+
+        start = time.perf_counter()
+        reloaded = await self.resync(guild_ids)
+
+        print(
+            f"Reconciled {reloaded}/{len(guild_ids)} guild(s) restored from the config "
+            f"snapshot in {(time.perf_counter() - start) * 1000:.0f}ms"
+        )
+        await config_snapshot.write()
+
+####################################################################################################
+    async def resync(self, guild_ids: List[int]) -> int:
+        """Reloads the given loaded guilds from one bulk read of their config,
+        instead of a read per guild. Returns how many were reloaded."""
+
+        if not guild_ids:
+            return 0
+
+        if not await db.drain_journal():
+            print(f"Resync of {len(guild_ids)} guild(s) postponed: journaled writes pending.")
+            return 0
+
+        # Versions are noted before the read, so a write overlapping it is noticed.
+        loaded = {
+            guild_id: guild_data for guild_id in guild_ids
+            if (guild_data := self.bot.k_guilds.get(guild_id)) is not None
+        }
+        versions = {
+            guild_id: guild_data.job_postings.config_version if guild_data.job_postings else None
+            for guild_id, guild_data in loaded.items()
+        }
+
+        try:
+            records = await db.fetch_guild_records(list(loaded))
+        except Exception as error:
+            print(f"Failed reading config of {len(loaded)} guild(s) ({error!r})")
+            return 0
+
+        semaphore = asyncio.Semaphore(int(os.environ.get("GUILD_LOAD_CONCURRENCY", 8)))
+
+        async def reload_one(guild_id: int, guild_data: GuildData) -> bool:
+            async with semaphore:
+                try:
+                    await guild_data.reload(self.bot, records[guild_id], versions[guild_id])
+                except Exception as error:
+                    print(f"Failed reloading: {guild_data.parent.name} || ID: {guild_id} ({error!r})")
+                    return False
+
+                return True
+
+        results = await asyncio.gather(*(reload_one(*item) for item in loaded.items()))
+        return sum(results)
+
+####################################################################################################
+    @Cog.listener("on_guild_remove")
+    async def guild_removed(self, guild: Guild) -> None:
+
+        self.evict(guild.id)
+
+####################################################################################################
+    def evict(self, guild_id: int) -> None:
+        """Drops a guild's data after the bot leaves it. Its stored config is kept,
+        in case the bot is added back later."""
+
+        reload = self._reloads.pop(guild_id, None)
+        if reload is not None:
+            reload.cancel()
+
+        guild_data = self.bot.k_guilds.remove(guild_id)
+        if guild_data is not None:
+            print(f"Evicted: {guild_data.parent.name} || ID: {guild_id}")
+
+####################################################################################################
+    async def admit(self, guilds: List[Guild]) -> None:
+        """Makes newly seen guilds available, loading them now or deferring them
+        to first use depending on ``GUILD_LOAD_MODE``."""
+
+        if not guilds:
+            return
+
+        if os.environ.get("GUILD_LOAD_MODE", "lazy").lower() == "eager":
+            await self.load_batch(guilds)
+            return
+
+        start = time.perf_counter()
+        configured = await db.fetch_configured_guilds([guild.id for guild in guilds])
+
+        # Guilds without any config get an empty one straight away, no queries needed.
+        for guild in guilds:
+            if guild.id in configured:
+                self.bot.k_guilds.defer(guild)
+                continue
 
             guild_data = GuildData(parent=guild)
-            await guild_data.load(bot=self.bot)
+            await guild_data.load(bot=self.bot, records=GuildRecords(None, [], []))
+            self.bot.k_guilds.add(guild_data)
+
+        warm = await db.fetch_active_guilds(
+            list(configured),
+            int(os.environ.get("GUILD_WARM_DAYS", 7)),
+            int(os.environ.get("GUILD_WARM_SIZE", 25))
+        )
+        await self.bot.k_guilds.ensure_many(warm)
+
+        print(
+            f"Admitted {len(guilds)} guild(s) in {(time.perf_counter() - start) * 1000:.0f}ms || "
+            f"{len(guilds) - len(configured)} without config || "
+            f"{len(warm)} warm loaded || {len(configured) - len(warm)} deferred"
+        )
+
+####################################################################################################
+    async def load_batch(self, guilds: List[Guild]) -> None:
+        """Loads the given guilds, skipping any that are already being loaded."""
+
+        guilds = [guild for guild in guilds if guild.id not in self._loading]
+        if not guilds:
+            return
+
+        guild_ids = [guild.id for guild in guilds]
+        self._loading.update(guild_ids)
+
+        try:
+            # Fetch every guild's stored config up front instead of per guild.
+            with boot_profiler.phase("guild_records"):
+                try:
+                    await db.assert_guild_entries(guild_ids)
+                    records = await db.fetch_guild_records(guild_ids)
+                except Exception as error:
+                    # They stay unloaded (or deferred, retried on next use) rather than half-loaded.
+                    print(f"Failed reading config of {len(guild_ids)} guild(s) ({error!r})")
+                    return
+
+            semaphore = asyncio.Semaphore(int(os.environ.get("GUILD_LOAD_CONCURRENCY", 8)))
+            timeout = float(os.environ.get("GUILD_LOAD_TIMEOUT", 60))
+            durations: Dict[Guild, float] = {}
+
+            await asyncio.gather(*(
+                self.load_guild(guild, records[guild.id], semaphore, timeout, durations)
+                for guild in guilds
+            ))
+        finally:
+            self._loading.difference_update(guild_ids)
+
+        if len(guilds) > 1:
+            self.print_load_summary(durations)
+
+####################################################################################################
+    async def load_guild(
+        self,
+        guild: Guild,
+        records: GuildRecords,
+        semaphore: asyncio.Semaphore,
+        timeout: float,
+        durations: Dict[Guild, float]
+    ) -> None:
+        """Loads a single guild and registers it as soon as it's ready. Failures
+        and timeouts are reported and skipped so they can't affect other guilds."""
+
+        async with semaphore:
+            start = time.perf_counter()
+            guild_data = GuildData(parent=guild)
+
+            try:
+                await asyncio.wait_for(guild_data.load(bot=self.bot, records=records), timeout)
+            except asyncio.TimeoutError:
+                print(f"Timed out loading: {guild.name} || ID: {guild.id} (after {timeout:g}s)")
+                return
+            except Exception as error:
+                print(f"Failed loading: {guild.name} || ID: {guild.id} ({error!r})")
+                return
+            finally:
+                durations[guild] = time.perf_counter() - start
+                boot_profiler.record_guild(guild.id, durations[guild])
+
+            # The bot may have left while this was loading.
+            if self.bot.get_guild(guild.id) is None:
+                return
+
+            self.bot.k_guilds.add(guild_data)
+            print(f"Loaded: {guild.name} || ID: {guild.id}")
+
+####################################################################################################
+    def config_changed(self, payload: Optional[str]) -> None:
+        """Handles a ``guild_config`` notification, sent whenever any process
+        changes a guild's crossposting config. ``None`` means notifications may
+        have been missed, so every loaded guild is refreshed."""
+
+        if payload is None:
+            if self._resync_task is None or self._resync_task.done():
+                self._resync_task = asyncio.create_task(self.resync_all())
+            return
+
+        guild_id, _, origin = payload.partition(":")
+
+        # Our own writes are already reflected in memory.
+        if origin == db.instance_name:
+            return
+
+        self.schedule_reload(int(guild_id))
+
+####################################################################################################
+    async def resync_all(self) -> None:
 
-            print("Success!")
+        await asyncio.sleep(float(os.environ.get("GUILD_RELOAD_DELAY", 1)))
 
-            self.bot.k_guilds.append(guild_data)
+        # As with single reloads, a notification from here on schedules another pass.
+        self._resync_task = None
+
+        guild_ids = [guild_data.parent.id for guild_data in self.bot.k_guilds]
+        start = time.perf_counter()
+        reloaded = await self.resync(guild_ids)
+
+        print(
+            f"Resynced {reloaded}/{len(guild_ids)} guild(s) "
+            f"in {(time.perf_counter() - start) * 1000:.0f}ms"
+        )
+
+####################################################################################################
+    def schedule_reload(self, guild_id: int) -> None:
+
+        if guild_id in self._reloads or guild_id not in self.bot.k_guilds:
+            return
+
+        self._reloads[guild_id] = asyncio.create_task(self.reload_guild(guild_id))
+
+####################################################################################################
+    async def reload_guild(self, guild_id: int) -> None:
+
+        await asyncio.sleep(float(os.environ.get("GUILD_RELOAD_DELAY", 1)))
+
+        # Anything notified from here on needs a fresh read, so let it schedule another.
+        self._reloads.pop(guild_id, None)
+
+        guild_data = self.bot.k_guilds.get(guild_id)
+        if guild_data is None:
+            return
+
+        try:
+            await guild_data.reload(self.bot)
+        except Exception as error:
+            print(f"Failed reloading: {guild_data.parent.name} || ID: {guild_id} ({error!r})")
+            return
+
+        print(f"Reloaded: {guild_data.parent.name} || ID: {guild_id}")
+
+####################################################################################################
+    def print_load_summary(self, durations: Dict[Guild, float]) -> None:
+
+        if not durations:
+            return
+
+        ordered = sorted(durations.values())
+
+        def percentile(p: float) -> float:
+            return ordered[max(0, math.ceil(p * len(ordered)) - 1)]
+
+        slowest = max(durations, key=durations.__getitem__)
+
+        print("========================================")
+        print(
+            f"Loaded {sum(g.id in self.bot.k_guilds for g in durations)}/{len(durations)} guild(s) || "
+            f"p50: {percentile(0.50) * 1000:.0f}ms || "
+            f"p95: {percentile(0.95) * 1000:.0f}ms || "
+            f"slowest: {slowest.name} ({slowest.id}) at {durations[slowest] * 1000:.0f}ms"
+        )
+
+####################################################################################################
+    @internal.command(
+        name="query_stats",
+        description="Per-statement database timings since startup. Bot owner only."
+    )
+    @option(
+        "reset",
+        bool,
+        description="Clear the collected numbers after showing them.",
+        required=False,
+        default=False
+    )
+    async def query_stats(self, ctx: ApplicationContext, reset: bool) -> None:
+
+        if not await self.bot.is_owner(ctx.author):  # type: ignore
+            await ctx.respond("This command is only available to the bot owner.", ephemeral=True)
+            return
+
+        # Most expensive statements first; an embed holds at most 25 fields.
+        ranked = sorted(db.query_stats.items(), key=lambda item: item[1].total_time, reverse=True)
+
+        fields = [
+            (
+                name,
+                (
+                    f"calls: {stats.calls} || errors: {stats.errors} || rows: {stats.rows}\n"
+                    f"total: {stats.total_time * 1000:.0f}ms || avg: {stats.average_time * 1000:.1f}ms\n"
+                    f"p95: ≤{stats.percentile(0.95) * 1000:.0f}ms || max: {stats.max_time * 1000:.0f}ms"
+                ),
+                False
+            )
+            for name, stats in ranked[:25]
+        ]
+
+        embed = make_embed(
+            title="Database Query Stats",
+            description=(
+                f"{len(ranked)} statement(s), {sum(s.calls for _, s in ranked)} call(s) recorded."
+            ),
+            fields=fields,
+            timestamp=True
+        )
+
+        if reset:
+            db.reset_query_stats()
+
+        await ctx.respond(embed=embed, ephemeral=True)
 
 ####################################################################################################
 def setup(bot: KinoKi) -> None:
@@ -45,4 +506,4 @@ def setup(bot: KinoKi) -> None:
 
     bot.add_cog(Internal(bot))
 
-####################################################################################################
\ No newline at end of file
+####################################################################################################
@@ -11,7 +11,7 @@ from discord    import (
     SlashCommandOptionType,
     Thread
 )
-from typing     import TYPE_CHECKING
+from typing     import TYPE_CHECKING, Optional
 
 from ui         import *
 from utilities  import *
@@ -68,7 +68,10 @@ class JobListeners(Cog):
     )
     async def postings_status(self, ctx: ApplicationContext) -> None:
 
-        guild_data = self.get_guild(ctx.guild_id)
+        guild_data = await self.get_guild(ctx)
+        if guild_data is None:
+            return
+
         status = guild_data.job_postings.status_all()
 
         await ctx.respond(embed=status)
@@ -99,7 +102,10 @@ class JobListeners(Cog):
         # Since the channel was just mentioned, it shouldn't be None.
         channel = await self.bot.fetch_channel(channel.id)
 
-        guild_data = self.get_guild(ctx.guild_id)
+        guild_data = await self.get_guild(ctx)
+        if guild_data is None:
+            return
+
         await guild_data.job_postings.add_source_channel(ctx.interaction, channel)  # type: ignore
 
         return
@@ -127,7 +133,10 @@ class JobListeners(Cog):
             await ctx.respond(embed=error, ephemeral=True)
             return
 
-        guild_data = self.get_guild(ctx.guild_id)
+        guild_data = await self.get_guild(ctx)
+        if guild_data is None:
+            return
+
         await guild_data.job_postings.add_post_channel(ctx.interaction, channel)
 
         return
@@ -153,7 +162,10 @@ class JobListeners(Cog):
             await ctx.respond(embed=error, ephemeral=True)
             return
 
-        guild_data = self.get_guild(ctx.guild_id)
+        guild_data = await self.get_guild(ctx)
+        if guild_data is None:
+            return
+
         await guild_data.job_postings.remove_source(ctx.interaction, channel)
 
         return
@@ -179,7 +191,10 @@ class JobListeners(Cog):
             await ctx.respond(embed=error, ephemeral=True)
             return
 
-        guild_data = self.get_guild(ctx.guild_id)
+        guild_data = await self.get_guild(ctx)
+        if guild_data is None:
+            return
+
         await guild_data.job_postings.remove_destination(ctx.interaction, channel)
 
         return
@@ -207,7 +222,10 @@ class JobListeners(Cog):
         )
     ) -> None:
 
-        guild_data = self.get_guild(ctx.guild_id)
+        guild_data = await self.get_guild(ctx)
+        if guild_data is None:
+            return
+
         jobs_data = guild_data.job_postings
 
         parent_channels = jobs_data.get_tag_parent_channels(tag_string)
@@ -217,7 +235,7 @@ class JobListeners(Cog):
             await ctx.respond(embed=error, ephemeral=True)
             return
 
-        jobs_data.map_tags(parent_tags, map_role)
+        await jobs_data.map_tags(parent_tags, map_role)
 
         confirm = make_embed(
             title="Success!",
@@ -254,7 +272,10 @@ class JobListeners(Cog):
         )
     ) -> None:
 
-        guild_data = self.get_guild(ctx.guild_id)
+        guild_data = await self.get_guild(ctx)
+        if guild_data is None:
+            return
+
         jobs_data = guild_data.job_postings
 
         parent_channels = jobs_data.get_tag_parent_channels(tag_string)
@@ -289,7 +310,10 @@ class JobListeners(Cog):
     )
     async def postings_map_status(self, ctx: ApplicationContext) -> None:
 
-        guild_data = self.get_guild(ctx.guild_id)
+        guild_data = await self.get_guild(ctx)
+        if guild_data is None:
+            return
+
         jobs_data = guild_data.job_postings
 
         await ctx.respond(embed=jobs_data.all_mappings())
@@ -297,11 +321,39 @@ class JobListeners(Cog):
         return
 
 ####################################################################################################
-    def get_guild(self, guild_id: int) -> "GuildData":
+    @postings.command(
+        name="activity",
+        description="View crossposting activity from the last seven days."
+    )
+    async def postings_activity(self, ctx: ApplicationContext) -> None:
+
+        guild_data = await self.get_guild(ctx)
+        if guild_data is None:
+            return
+
+        if not ctx.response.is_done():
+            await ctx.defer()
+        await ctx.respond(embed=await guild_data.job_postings.activity_stats())
+
+        return
+
+####################################################################################################
+    async def get_guild(self, ctx: ApplicationContext) -> Optional["GuildData"]:
+        """Returns the data for the invoking guild, loading it first if it was
+        deferred. Responds with an error message and returns ``None`` if it
+        can't be loaded.
+
+        Loading can outlast Discord's three seconds to answer an interaction, so the
+        interaction is deferred first and the command's reply becomes a followup."""
+
+        if self.bot.k_guilds.is_deferred(ctx.guild_id) and not ctx.response.is_done():
+            await ctx.defer()
+
+        guild_data = await self.bot.k_guilds.ensure(ctx.guild_id)
+        if guild_data is None:
+            await ctx.respond(embed=GuildNotLoaded(), ephemeral=True)
 
-        for guild in self.bot.k_guilds:
-            if guild.parent.id == guild_id:
-                return guild
+        return guild_data
 
 ####################################################################################################
 def setup(bot: "KinoKi") -> None:
@@ -34,9 +34,18 @@ class Listeners(Cog):
     @Cog.listener("on_thread_create")
     async def crosspost(self, thread: Thread) -> None:
 
-        jobs_data = self.get_guild(thread.guild.id).job_postings
+        # Only forum threads can come from a source channel. Checking first keeps
+        # other threads from loading a deferred guild's config.
+        if thread.parent is None or thread.parent.type is not ChannelType.forum:
+            return
 
-        if thread.parent not in jobs_data.source_channels:
+        guild = await self.bot.k_guilds.ensure(thread.guild.id)
+        if guild is None:
+            return
+
+        jobs_data = guild.job_postings
+
+        if thread.parent_id not in jobs_data.source_ids:
             return
 
         if not thread.applied_tags:
@@ -45,19 +54,19 @@ class Listeners(Cog):
         role_list = []
 
         for tag in thread.applied_tags:
-            for role in thread.guild.roles:
-                if tag.name.lower() == role.name.lower():
-                    role_list.append(role)
-                    jobs_data.update_stats(role)
+            route = jobs_data.routes.get(tag.id)
+            if route is None:
+                continue
+
+            role_list.extend(route.role_ids)
+            for role_id in route.tracked:
+                jobs_data.update_stats(role_id)
 
-            for job_tag in jobs_data.tags:
-                if job_tag.parent.name.lower() == tag.name.lower():
-                    for i in job_tag.roles:
-                        role_list.append(i)
+        role_ids = list(dict.fromkeys(role_list))
+        jobs_data.record_crosspost(thread, role_ids)
 
-        string_mentions = [r.mention for r in role_list]
+        string_mentions = [f"<@&{r}>" for r in role_ids]
         mention_string = " | ".join(string_mentions)
-        thread_message = await thread.fetch_message(thread.id)
 
         summary = (
             f">>> **New Post in {thread.parent.mention}**\n"
@@ -66,8 +75,7 @@ class Listeners(Cog):
             f"{thread.jump_url}"
         )
 
-        for channel in jobs_data.post_channels:
-            await channel.send(summary)
+        await jobs_data.send_to_destinations(summary)
 
         return
 
@@ -75,55 +83,64 @@ class Listeners(Cog):
     @Cog.listener("on_guild_channel_delete")
     async def channel_delete(self, channel: GuildChannel) -> None:
 
-        try:
-            guild_data = self.get_guild(channel.guild.id)
-        except:
+        guild_data = self.bot.k_guilds.get(channel.guild.id)
+        if guild_data is None:
             return
 
         if channel.type is ChannelType.forum or channel.type is ChannelType.text:
-            guild_data.job_postings.yeet_channel(channel)  # type: ignore
+            await guild_data.job_postings.yeet_channel(channel)  # type: ignore
 
 ####################################################################################################
     @Cog.listener("on_guild_channel_update")
     async def channel_edit(self, before: ForumChannel, after: ForumChannel) -> None:
 
-        guild = self.get_guild(before.guild.id)
+        guild = self.bot.k_guilds.get(before.guild.id)
+        if guild is None:
+            return
 
         if before.type is not ChannelType.forum:
             return
 
-        for tag in before.available_tags:
-            if tag.id not in [t.id for t in after.available_tags]:
-                for i, t in enumerate(guild.job_postings.tags):
-                    if t.parent.id == tag.id:
-                        guild.job_postings.tags.pop(i)
-                        break
+        # Only tag additions, removals and renames affect crossposting.
+        if [(t.id, t.name) for t in before.available_tags] == [(t.id, t.name) for t in after.available_tags]:
+            return
+
+        await guild.job_postings.forum_tags_changed(after)
 
 ####################################################################################################
     @Cog.listener("on_guild_role_delete")
     async def role_delete(self, role: Role):
 
-        guild = self.get_guild(role.guild.id)
-
-        found, tags = guild.job_postings.check_for_role_mapping(role)
-        print(found)
-        print(tags)
-        if not found:
+        guild = self.bot.k_guilds.get(role.guild.id)
+        if guild is None:
             return
 
-        for tag in tags:
-            tag.remove_role(role)
-
-        guild.job_postings.clean_up_tags()
+        await guild.job_postings.role_removed(role)
 
         return
 
 ####################################################################################################
-    def get_guild(self, guild_id: int) -> GuildData:
+    @Cog.listener("on_guild_role_create")
+    async def role_create(self, role: Role) -> None:
+
+        guild = self.bot.k_guilds.get(role.guild.id)
+        if guild is None:
+            return
+
+        guild.job_postings.refresh_routes([role.name])
+
+####################################################################################################
+    @Cog.listener("on_guild_role_update")
+    async def role_edit(self, before: Role, after: Role) -> None:
+
+        if before.name == after.name:
+            return
+
+        guild = self.bot.k_guilds.get(after.guild.id)
+        if guild is None:
+            return
 
-        for guild in self.bot.k_guilds:
-            if guild.parent.id == guild_id:
-                return guild
+        guild.job_postings.refresh_routes([before.name, after.name])
 
 ####################################################################################################
 def setup(bot: KinoKi) -> None:
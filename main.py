@@ -1,5 +1,10 @@
 """Main project file. Initializes client connection and status loop."""
 
+import time
+
+# Taken before anything else is imported, so the boot report covers import time too.
+BOOT_START = time.perf_counter()
+
 import os
 
 from discord        import Game, Intents
@@ -8,6 +13,13 @@ from dotenv         import load_dotenv
 from itertools      import cycle
 
 from classes.bot    import KinoKi
+from utilities      import boot_profiler
+####################################################################################################
+# Boot profiling
+
+boot_profiler.start(BOOT_START)
+boot_profiler.record("imports", BOOT_START, time.perf_counter())
+
 ####################################################################################################
 # Secret things
 
@@ -16,9 +28,10 @@ load_dotenv()
 ####################################################################################################
 # Instantiate bot
 
-bot = KinoKi(
-    intents=Intents.default()
-)
+with boot_profiler.phase("bot_init"):
+    bot = KinoKi(
+        intents=Intents.default()
+    )
 
 ####################################################################################################
 # Load status list into memory for usage in change_status()`
@@ -51,9 +64,12 @@ async def change_status():
 ####################################################################################################
 # Load modules - This part is magic.
 
-for filename in os.listdir("./cogs"):
-    if filename.endswith(".py") and filename != "__init__.py":
-        bot.load_extension(f"cogs.{filename[:-3]}")
+with boot_profiler.phase("cogs"):
+    for filename in os.listdir("./cogs"):
+        if filename.endswith(".py") and filename != "__init__.py":
+            # Covers both importing the cog module and running its `setup`.
+            with boot_profiler.phase(f"cog:{filename[:-3]}"):
+                bot.load_extension(f"cogs.{filename[:-3]}")
 
 ####################################################################################################
 # Ready go!
@@ -0,0 +1,33 @@
+-- Converts the array columns that were stored as Postgres array text
+-- (e.g. '{1,2}' or '{"1","2"}') into native bigint[] columns, in place.
+--
+-- Safe to re-run: each column is only converted while it isn't an array yet.
+-- Applied at startup by `utilities.migrations`, inside its own transaction.
+
+DO $$
+DECLARE
+    target RECORD;
+BEGIN
+    FOR target IN
+        SELECT table_name, column_name FROM information_schema.columns
+        WHERE table_schema = current_schema()
+          AND (table_name, column_name) IN (
+              ('job_postings', 'sources'),
+              ('job_postings', 'destinations'),
+              ('job_tags', 'role_ids')
+          )
+          AND data_type <> 'ARRAY'
+    LOOP
+        EXECUTE format(
+            'ALTER TABLE %1$I '
+            '    ALTER COLUMN %2$I DROP DEFAULT, '
+            '    ALTER COLUMN %2$I TYPE bigint[] USING coalesce('
+            '        array_remove(string_to_array(translate(btrim(%2$I, ''{}''), ''''''" '', ''''), '',''), '''')::bigint[],'
+            '        ''{}'''
+            '    ), '
+            '    ALTER COLUMN %2$I SET DEFAULT ''{}''',
+            target.table_name, target.column_name
+        );
+    END LOOP;
+END
+$$;
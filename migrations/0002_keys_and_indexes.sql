@@ -0,0 +1,72 @@
+-- Creates the bot's tables on a fresh database and gives existing ones the keys
+-- and indexes the data-access layer relies on:
+--
+--   job_postings  WHERE guild_id                 -> primary key
+--   job_tags      WHERE guild_id                 -> job_tags_key (leading column)
+--   job_tags      WHERE channel_id AND tag_id    -> job_tags_channel_tag_idx
+--   job_stats     WHERE guild_id                 -> job_stats_key (leading column, covers count)
+--   job_stats     WHERE role_id                  -> job_stats_role_idx
+--   job_stats     ON CONFLICT (guild_id, role_id) -> job_stats_key
+
+CREATE TABLE IF NOT EXISTS job_postings (
+    guild_id        bigint      PRIMARY KEY,
+    sources         bigint[]    NOT NULL DEFAULT '{}',
+    destinations    bigint[]    NOT NULL DEFAULT '{}'
+);
+
+CREATE TABLE IF NOT EXISTS job_tags (
+    guild_id        bigint      NOT NULL,
+    channel_id      bigint      NOT NULL,
+    tag_id          bigint      NOT NULL,
+    role_ids        bigint[]    NOT NULL DEFAULT '{}'
+);
+
+CREATE TABLE IF NOT EXISTS job_stats (
+    role_id         bigint      NOT NULL,
+    guild_id        bigint      NOT NULL,
+    count           bigint      NOT NULL DEFAULT 0
+);
+
+-- Rows written before these keys existed may be duplicated; fold them together
+-- so the unique indexes below can be built.
+
+CREATE TEMPORARY TABLE merged_job_tags ON COMMIT DROP AS
+    SELECT t.guild_id, t.channel_id, t.tag_id, array_agg(DISTINCT r.role_id) AS role_ids
+    FROM job_tags t
+    CROSS JOIN LATERAL unnest(t.role_ids) AS r (role_id)
+    WHERE (t.guild_id, t.channel_id, t.tag_id) IN (
+        SELECT guild_id, channel_id, tag_id FROM job_tags
+        GROUP BY guild_id, channel_id, tag_id HAVING count(*) > 1
+    )
+    GROUP BY t.guild_id, t.channel_id, t.tag_id;
+
+DELETE FROM job_tags t USING (
+    SELECT guild_id, channel_id, tag_id FROM job_tags
+    GROUP BY guild_id, channel_id, tag_id HAVING count(*) > 1
+) d
+WHERE t.guild_id = d.guild_id AND t.channel_id = d.channel_id AND t.tag_id = d.tag_id;
+
+INSERT INTO job_tags (guild_id, channel_id, tag_id, role_ids)
+    SELECT guild_id, channel_id, tag_id, role_ids FROM merged_job_tags;
+
+CREATE TEMPORARY TABLE merged_job_stats ON COMMIT DROP AS
+    SELECT guild_id, role_id, sum(count) AS count FROM job_stats
+    GROUP BY guild_id, role_id HAVING count(*) > 1;
+
+DELETE FROM job_stats s USING merged_job_stats m
+WHERE s.guild_id = m.guild_id AND s.role_id = m.role_id;
+
+INSERT INTO job_stats (role_id, guild_id, count)
+    SELECT role_id, guild_id, count FROM merged_job_stats;
+
+CREATE UNIQUE INDEX IF NOT EXISTS job_tags_key
+    ON job_tags (guild_id, channel_id, tag_id);
+
+CREATE INDEX IF NOT EXISTS job_tags_channel_tag_idx
+    ON job_tags (channel_id, tag_id);
+
+CREATE UNIQUE INDEX IF NOT EXISTS job_stats_key
+    ON job_stats (guild_id, role_id) INCLUDE (count);
+
+CREATE INDEX IF NOT EXISTS job_stats_role_idx
+    ON job_stats (role_id);
@@ -0,0 +1,46 @@
+-- Append-only log of every crosspost, plus the hourly and daily rollups that
+-- stats views read from. Events are folded into the rollups exactly once, by
+-- flipping `rolled_up` in the same statement that aggregates them, and can be
+-- pruned by age afterwards without losing any history.
+--
+-- Rollup rows are keyed by a dimension: 'all' (dim_id 0) counts posts,
+-- 'tag' and 'role' count posts carrying that forum tag or mentioning that role.
+-- Buckets are UTC.
+
+CREATE TABLE IF NOT EXISTS crosspost_events (
+    id              bigserial   PRIMARY KEY,
+    guild_id        bigint      NOT NULL,
+    thread_id       bigint      NOT NULL,
+    channel_id      bigint      NOT NULL,
+    tag_ids         bigint[]    NOT NULL DEFAULT '{}',
+    role_ids        bigint[]    NOT NULL DEFAULT '{}',
+    posted_at       timestamptz NOT NULL DEFAULT now(),
+    rolled_up       boolean     NOT NULL DEFAULT false
+);
+
+CREATE INDEX IF NOT EXISTS crosspost_events_pending_idx
+    ON crosspost_events (id) WHERE NOT rolled_up;
+
+CREATE INDEX IF NOT EXISTS crosspost_events_posted_at_idx
+    ON crosspost_events (posted_at);
+
+CREATE TABLE IF NOT EXISTS crosspost_hourly (
+    guild_id        bigint      NOT NULL,
+    dimension       text        NOT NULL,
+    dim_id          bigint      NOT NULL,
+    bucket          timestamp   NOT NULL,
+    posts           integer     NOT NULL,
+    PRIMARY KEY (guild_id, dimension, dim_id, bucket)
+);
+
+CREATE INDEX IF NOT EXISTS crosspost_hourly_bucket_idx
+    ON crosspost_hourly (bucket);
+
+CREATE TABLE IF NOT EXISTS crosspost_daily (
+    guild_id        bigint      NOT NULL,
+    dimension       text        NOT NULL,
+    dim_id          bigint      NOT NULL,
+    bucket          date        NOT NULL,
+    posts           integer     NOT NULL,
+    PRIMARY KEY (guild_id, dimension, dim_id, bucket)
+);
@@ -0,0 +1,26 @@
+-- Announces every change to a guild's crossposting config on the `guild_config`
+-- channel, so other bot processes can reload just that guild. The payload is
+-- `<guild_id>:<application_name>`; each process sets a unique application_name
+-- and ignores its own writes. Identical payloads within one transaction are
+-- delivered once, so bulk statements don't flood listeners.
+
+CREATE OR REPLACE FUNCTION notify_guild_config() RETURNS trigger AS $$
+BEGIN
+    PERFORM pg_notify(
+        'guild_config',
+        (CASE WHEN TG_OP = 'DELETE' THEN OLD.guild_id ELSE NEW.guild_id END)::text
+            || ':' || current_setting('application_name')
+    );
+    RETURN NULL;
+END
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS job_postings_notify ON job_postings;
+CREATE TRIGGER job_postings_notify
+    AFTER INSERT OR UPDATE OR DELETE ON job_postings
+    FOR EACH ROW EXECUTE FUNCTION notify_guild_config();
+
+DROP TRIGGER IF EXISTS job_tags_notify ON job_tags;
+CREATE TRIGGER job_tags_notify
+    AFTER INSERT OR UPDATE OR DELETE ON job_tags
+    FOR EACH ROW EXECUTE FUNCTION notify_guild_config();
@@ -0,0 +1,9 @@
+-- Records which local write journal entries have been replayed. The marker is
+-- inserted in the same transaction as the entry's statements, so an entry that
+-- is replayed a second time (after a crash before the journal was trimmed)
+-- is recognised and skipped instead of applied twice.
+
+CREATE TABLE IF NOT EXISTS write_journal_applied (
+    entry_id        text        PRIMARY KEY,
+    applied_at      timestamptz NOT NULL DEFAULT now()
+);
@@ -1,5 +1,9 @@
 from .colors    import random_all
 from .database  import *
 from .errors    import *
+from .migrations import *
+from .profiler  import *
+from .snapshot  import *
+from .stats     import *
 from .utils     import *
 ####################################################################################################
\ No newline at end of file
@@ -1,38 +1,1118 @@
+from __future__ import annotations
+
+import asyncio
+import asyncpg
 import os
-import psycopg2
+import time
+import uuid
+
+from contextlib import asynccontextmanager
+from datetime   import date, datetime
+from itertools  import groupby
+from types      import MappingProxyType
+from typing     import (
+    Any,
+    AsyncIterator,
+    Awaitable,
+    Callable,
+    Dict,
+    List,
+    Mapping,
+    NamedTuple,
+    Optional,
+    Sequence,
+    Set,
+    Tuple,
+    TypeVar
+)
+
+from .journal   import JournalStatement, write_journal
 ####################################################################################################
 
-__all__ = ("db_connection", "assert_database_entries")
+__all__ = ("db", "Database", "GuildRecords", "QueryStats", "UnitOfWork")
+
+T = TypeVar("T")
+R = TypeVar("R")
 
 ####################################################################################################
-# Environment variables
+# Errors that indicate the connection itself is unusable, rather than the statement being bad.
+
+CONNECTION_ERRORS = (
+    OSError,
+    asyncpg.ConnectionDoesNotExistError,
+    asyncpg.InterfaceError,
+    asyncpg.PostgresConnectionError,
+    asyncpg.CannotConnectNowError,
+    # Raised on open connections when the server is shut down or restarts, e.g. during a failover.
+    asyncpg.AdminShutdownError,
+    asyncpg.CrashShutdownError,
+)
 
-DATABASE = os.environ.get("DATABASE_URL", None)
 ####################################################################################################
-# Open database connection
-# I prefer to create a cursor at the time of data query, so just
-# setting up a connection is good for now
+def _is_connection_error(error: BaseException, *, timeouts: bool = False) -> bool:
+    """Whether ``error`` means the database couldn't be reached, as opposed to the
+    statement itself failing.
 
-db_connection = psycopg2.connect(DATABASE, sslmode="require")
-print("Database connection initialized...")
+    Since Python 3.11 a timeout is an :class:`OSError` too, so it would match
+    :data:`CONNECTION_ERRORS`. A statement timing out is a slow statement rather
+    than a lost connection, so it only counts if ``timeouts`` is set, as when connecting.
+    """
+
+    if isinstance(error, asyncio.TimeoutError):
+        return timeouts
+
+    return isinstance(error, CONNECTION_ERRORS)
 
 ####################################################################################################
-def assert_database_entries(guild_id: int) -> None:
-    """Creates new records in all guild ID-dependant tables when the
-    bot joins a new guild.
+class GuildRecords(NamedTuple):
+    """The raw database rows making up a single guild's stored configuration."""
+
+    postings: Optional[asyncpg.Record]
+    tags: List[asyncpg.Record]
+    stats: List[asyncpg.Record]
+
+####################################################################################################
+class QueryStats:
+    """Running totals for every execution of one named statement.
+
+    Latencies are kept in a fixed-bucket histogram rather than as raw samples,
+    so the cost of tracking a statement doesn't grow with how often it runs.
     """
 
-    c = db_connection.cursor()
+    # Upper bounds of the latency buckets, in milliseconds. The last bucket catches the rest.
+    BUCKETS: Tuple[float, ...] = (1, 5, 10, 25, 50, 100, 250, 500, 1000, 5000)
 
-    c.execute(
-        "INSERT INTO job_postings (guild_id) VALUES (%s) ON CONFLICT "
-        "(guild_id) DO NOTHING",
-        (guild_id, )
+    __slots__ = (
+        "calls",
+        "errors",
+        "rows",
+        "total_time",
+        "max_time",
+        "histogram"
     )
 
-    db_connection.commit()
-    c.close()
+    def __init__(self):
+
+        self.calls: int = 0
+        self.errors: int = 0
+        self.rows: int = 0
+        self.total_time: float = 0.0
+        self.max_time: float = 0.0
+        self.histogram: List[int] = [0] * (len(self.BUCKETS) + 1)
+
+####################################################################################################
+    def record(self, elapsed: float, rows: int, *, failed: bool = False) -> None:
+
+        self.calls += 1
+        self.errors += failed
+        self.rows += rows
+        self.total_time += elapsed
+        self.max_time = max(self.max_time, elapsed)
+
+        ms = elapsed * 1000
+        for i, bound in enumerate(self.BUCKETS):
+            if ms <= bound:
+                self.histogram[i] += 1
+                break
+        else:
+            self.histogram[-1] += 1
+
+####################################################################################################
+    @property
+    def average_time(self) -> float:
+
+        return self.total_time / self.calls if self.calls else 0.0
+
+####################################################################################################
+    def percentile(self, p: float) -> float:
+        """Returns the upper bound, in seconds, of the bucket holding the ``p`` quantile."""
+
+        target = p * self.calls
+        seen = 0
+        for i, count in enumerate(self.histogram):
+            seen += count
+            if seen >= target and count:
+                return (self.BUCKETS[i] if i < len(self.BUCKETS) else self.max_time * 1000) / 1000
+
+        return 0.0
+
+####################################################################################################
+class UnitOfWork:
+    """Collects the writes making up one user-visible operation.
+
+    Statements queued here aren't sent until the surrounding
+    :meth:`Database.transaction` block exits, at which point they're committed
+    together in a single transaction, or not at all.
+    """
+
+    __slots__ = ("statements", )
+
+    def __init__(self):
+
+        self.statements: List[Tuple[str, str, Tuple[Any, ...], Optional[int]]] = []
+
+####################################################################################################
+    def add(self, name: str, query: str, *args, guild_id: Optional[int] = None) -> None:
+
+        self.statements.append((name, query, args, guild_id))
+
+####################################################################################################
+    def __len__(self) -> int:
+
+        return len(self.statements)
+
+####################################################################################################
+def _status_rows(status: Optional[str]) -> int:
+    """Extracts the row count from a command status such as ``"UPDATE 3"``."""
+
+    last = status.rsplit(" ", 1)[-1] if status else ""
+    return int(last) if last.isdigit() else 0
+
+####################################################################################################
+def _env_number(name: str, default: T, cast: Callable[[str], T]) -> T:
+
+    value = os.environ.get(name)
+    return default if value is None else cast(value)
+
+####################################################################################################
+class Database:
+    """The bot's asynchronous data-access layer.
+
+    Every query is run on a connection borrowed from a managed :class:`asyncpg.Pool`,
+    so a slow round trip only suspends the awaiting coroutine instead of the
+    whole event loop. The pool is opened by :meth:`connect` during bot startup.
+
+    Statements that fail because their connection dropped are retried with
+    exponential backoff, and a background task periodically checks that the
+    pool's connections are still alive, recycling them if they aren't.
+
+    Writes that can't reach the database are kept in the local :data:`write_journal`
+    instead of failing, and replayed in order once it's reachable again. While
+    anything is waiting there, new writes queue behind it to keep their order.
+
+    Every connection identifies itself with a per-process ``application_name``
+    (see :attr:`instance_name`), and :meth:`listen` subscribes to ``NOTIFY``
+    channels over one extra, dedicated connection.
+
+    Array columns are native ``bigint[]``, so asyncpg decodes them straight into
+    lists of :class:`int` (see ``migrations/0001_bigint_arrays.sql``).
+
+    Environment Variables:
+    ----------------------
+    DATABASE_URL:
+        The Postgres connection string.
+
+    DATABASE_POOL_MIN_SIZE / DATABASE_POOL_MAX_SIZE:
+        Bounds of the connection pool. Defaults to ``1`` and ``10``.
+
+    DATABASE_STATEMENT_TIMEOUT:
+        Seconds any single statement may run before being cancelled. Defaults to ``10``.
+
+    DATABASE_MAX_RETRIES:
+        Attempts made to (re)connect or re-run a statement on connection loss. Defaults to ``5``.
+
+    DATABASE_HEALTH_INTERVAL:
+        Seconds between liveness checks of the pool. Defaults to ``60``.
+
+    DATABASE_SLOW_QUERY_MS:
+        Statements taking longer than this many milliseconds are logged. Defaults to ``250``.
+
+    WRITE_JOURNAL_REPLAY_INTERVAL:
+        Seconds between attempts to replay journaled writes. Defaults to ``5``.
+    """
+
+    __slots__ = (
+        "_pool",
+        "_max_retries",
+        "_health_interval",
+        "_health_task",
+        "_slow_threshold",
+        "_stats",
+        "_dsn",
+        "_instance",
+        "_listen_conn",
+        "_listen_task",
+        "_listeners",
+        "_replay_task",
+        "_replay_lock",
+        "_resync_pending"
+    )
+
+####################################################################################################
+    def __init__(self):
+
+        self._pool: Optional[asyncpg.Pool] = None
+        self._max_retries: int = 5
+        self._health_interval: float = 60.0
+        self._health_task: Optional[asyncio.Task] = None
+        self._slow_threshold: float = 0.25
+        self._stats: Dict[str, QueryStats] = {}
+
+        self._dsn: Optional[str] = None
+        self._instance: str = f"kinoki-{os.getpid()}-{uuid.uuid4().hex[:8]}"
+        self._listen_conn: Optional[asyncpg.Connection] = None
+        self._listen_task: Optional[asyncio.Task] = None
+        self._listeners: Dict[str, List[Callable[[Optional[str]], None]]] = {}
+
+        self._replay_task: Optional[asyncio.Task] = None
+        self._replay_lock: asyncio.Lock = asyncio.Lock()
+        self._resync_pending: bool = False
+
+####################################################################################################
+    @property
+    def connected(self) -> bool:
+
+        return self._pool is not None
+
+####################################################################################################
+    @property
+    def instance_name(self) -> str:
+        """The ``application_name`` this process's connections report, unique per process."""
+
+        return self._instance
+
+####################################################################################################
+    @property
+    def query_stats(self) -> Mapping[str, QueryStats]:
+        """A read-only view of the per-statement metrics, keyed by statement name."""
+
+        return MappingProxyType(self._stats)
+
+####################################################################################################
+    def reset_query_stats(self) -> None:
+
+        self._stats = {}
+
+####################################################################################################
+    async def connect(
+        self,
+        dsn: Optional[str] = None,
+        *,
+        min_size: Optional[int] = None,
+        max_size: Optional[int] = None,
+        statement_timeout: Optional[float] = None,
+        max_retries: Optional[int] = None,
+        health_interval: Optional[float] = None
+    ) -> None:
+        """Opens the connection pool, retrying with backoff if the database
+        can't be reached. Any argument left as ``None`` is read from the environment.
+        """
+
+        if self._pool is not None:
+            return
+
+        dsn = self._dsn = dsn or os.environ.get("DATABASE_URL", None)
+        min_size = min_size if min_size is not None else _env_number("DATABASE_POOL_MIN_SIZE", 1, int)
+        max_size = max_size if max_size is not None else _env_number("DATABASE_POOL_MAX_SIZE", 10, int)
+        max_size = max(min_size, max_size)
+        timeout = (
+            statement_timeout if statement_timeout is not None
+            else _env_number("DATABASE_STATEMENT_TIMEOUT", 10.0, float)
+        )
+        self._max_retries = (
+            max_retries if max_retries is not None
+            else _env_number("DATABASE_MAX_RETRIES", 5, int)
+        )
+        self._health_interval = (
+            health_interval if health_interval is not None
+            else _env_number("DATABASE_HEALTH_INTERVAL", 60.0, float)
+        )
+        self._slow_threshold = _env_number("DATABASE_SLOW_QUERY_MS", 250.0, float) / 1000
+
+        async def create() -> asyncpg.Pool:
+            return await asyncpg.create_pool(
+                dsn,
+                ssl="require",
+                min_size=min_size,
+                max_size=max_size,
+                # Client-side cancellation, backed by a server-side limit in case the client hangs.
+                command_timeout=timeout,
+                server_settings={
+                    "statement_timeout": str(int(timeout * 1000)),
+                    "application_name": self._instance
+                },
+                max_inactive_connection_lifetime=300.0
+            )
+
+        # A timeout while connecting is worth retrying, unlike a statement timeout.
+        self._pool = await self._with_backoff(create, retry_timeouts=True)
+        self._health_task = asyncio.create_task(self._health_loop())
+
+        await write_journal.open()
+        self._replay_task = asyncio.create_task(self._replay_loop())
+
+        print(f"Database connection pool initialized ({min_size}-{max_size} connections)...")
+
+####################################################################################################
+    async def close(self) -> None:
+
+        if self._health_task is not None:
+            self._health_task.cancel()
+            self._health_task = None
+
+        if self._listen_task is not None:
+            self._listen_task.cancel()
+            self._listen_task = None
+
+        if self._replay_task is not None:
+            self._replay_task.cancel()
+            self._replay_task = None
+
+        if self._listen_conn is not None:
+            conn, self._listen_conn = self._listen_conn, None
+            conn.remove_termination_listener(self._listener_lost)
+            await conn.close()
+
+        if self._pool is not None:
+            await self._pool.close()
+            self._pool = None
+
+####################################################################################################
+    async def pool(self) -> asyncpg.Pool:
+        """Returns the connection pool.
+
+        Raises:
+        -------
+        :class:`RuntimeError`
+            If :meth:`connect` hasn't been called yet.
+        """
+
+        if self._pool is None:
+            raise RuntimeError("The database pool hasn't been connected yet.")
+
+        return self._pool
+
+####################################################################################################
+    async def _with_backoff(
+        self,
+        operation: Callable[[], Awaitable[R]],
+        *,
+        retry_timeouts: bool = False
+    ) -> R:
+        """Runs ``operation``, retrying with exponential backoff on connection errors,
+        and on timeouts too if ``retry_timeouts`` is set."""
+
+        delay = 0.5
+        for attempt in range(1, self._max_retries + 1):
+            try:
+                return await operation()
+            except Exception as error:
+                if not _is_connection_error(error, timeouts=retry_timeouts):
+                    raise
+                if attempt == self._max_retries:
+                    raise
+
+                print(
+                    f"Database connection error ({type(error).__name__}), "
+                    f"retrying in {delay:.1f}s [{attempt}/{self._max_retries}]"
+                )
+                await asyncio.sleep(delay)
+                delay = min(delay * 2, 30.0)
+
+        raise RuntimeError("unreachable")
+
+####################################################################################################
+    async def listen(self, channel: str, callback: Callable[[Optional[str]], None]) -> None:
+        """Calls ``callback`` with the payload of every ``NOTIFY`` on ``channel``.
+
+        Notifications arrive over a dedicated connection, opened on first use. If
+        it drops, it's re-opened with backoff and every callback is then called
+        with ``None``, since notifications sent in the meantime were missed.
+        """
+
+        callbacks = self._listeners.setdefault(channel, [])
+        callbacks.append(callback)
+
+        if self._listen_conn is None:
+            await self._open_listener()
+        elif len(callbacks) == 1:
+            await self._listen_conn.add_listener(channel, self._dispatch)
+
+####################################################################################################
+    async def _open_listener(self) -> None:
+
+        async def connect() -> asyncpg.Connection:
+            return await asyncpg.connect(
+                self._dsn, ssl="require", server_settings={"application_name": self._instance}
+            )
+
+        conn = await self._with_backoff(connect, retry_timeouts=True)
+        conn.add_termination_listener(self._listener_lost)
+
+        for channel in self._listeners:
+            await conn.add_listener(channel, self._dispatch)
+
+        self._listen_conn = conn
+
+####################################################################################################
+    def _dispatch(self, _conn: asyncpg.Connection, _pid: int, channel: str, payload: str) -> None:
+
+        for callback in self._listeners.get(channel, ()):
+            try:
+                callback(payload)
+            except Exception as error:
+                print(f"Error handling notification on {channel}: {error!r}")
+
+####################################################################################################
+    def _listener_lost(self, _conn: asyncpg.Connection) -> None:
+
+        self._listen_conn = None
+        print("Database notification connection lost, reconnecting...")
+
+        async def reconnect() -> None:
+            while True:
+                try:
+                    await self._open_listener()
+                    break
+                except Exception as error:
+                    print(f"Database notification reconnect failed ({error!r}), retrying in 30s.")
+                    await asyncio.sleep(30)
+
+            # Listeners reload from the database, which must have our journaled writes first.
+            if await self.drain_journal():
+                self._resync_listeners()
+
+        self._listen_task = asyncio.create_task(reconnect())
+
+####################################################################################################
+    def _resync_listeners(self) -> None:
+        """Calls every listener with ``None``, telling it that notifications may have been missed."""
+
+        self._resync_pending = False
+
+        for callbacks in self._listeners.values():
+            for callback in callbacks:
+                try:
+                    callback(None)
+                except Exception as error:
+                    print(f"Error resyncing notification listener: {error!r}")
+
+####################################################################################################
+    async def _health_loop(self) -> None:
+        """Periodically verifies that pooled connections are alive. If the check
+        fails, every idle connection is expired so the pool reconnects from scratch.
+        """
+
+        while True:
+            await asyncio.sleep(self._health_interval)
+
+            if self._pool is None:
+                return
+
+            try:
+                await self._pool.fetchval("SELECT 1")
+            except Exception as error:
+                # Anything escaping here would end liveness checks for good.
+                print(f"Database liveness check failed ({error!r}), recycling connections.")
+                await self._pool.expire_connections()
+
+####################################################################################################
+    def _record(
+        self, name: str, elapsed: float, rows: int, guild_id: Optional[int], *, failed: bool = False
+    ) -> None:
+
+        self._stats.setdefault(name, QueryStats()).record(elapsed, rows, failed=failed)
+
+        if elapsed >= self._slow_threshold:
+            print(
+                f"Slow query: {name} took {elapsed * 1000:.0f}ms "
+                f"(guild: {guild_id if guild_id is not None else 'n/a'}, rows: {rows})"
+            )
+
+####################################################################################################
+    async def _timed(
+        self,
+        name: str,
+        guild_id: Optional[int],
+        operation: Callable[[], Awaitable[R]],
+        row_count: Callable[[R], int]
+    ) -> R:
+        """Runs ``operation``, recording its latency and row count under ``name``."""
+
+        start = time.perf_counter()
+        try:
+            result = await operation()
+        except BaseException:
+            self._record(name, time.perf_counter() - start, 0, guild_id, failed=True)
+            raise
+
+        self._record(name, time.perf_counter() - start, row_count(result), guild_id)
+        return result
+
+####################################################################################################
+    async def execute(self, name: str, query: str, *args, guild_id: Optional[int] = None) -> str:
+
+        pool = await self.pool()
+        return await self._timed(
+            name, guild_id, lambda: self._with_backoff(lambda: pool.execute(query, *args)), _status_rows
+        )
+
+####################################################################################################
+    async def fetch(
+        self, name: str, query: str, *args, guild_id: Optional[int] = None
+    ) -> List[asyncpg.Record]:
+
+        pool = await self.pool()
+        return await self._timed(
+            name, guild_id, lambda: self._with_backoff(lambda: pool.fetch(query, *args)), len
+        )
+
+####################################################################################################
+    async def fetchrow(
+        self, name: str, query: str, *args, guild_id: Optional[int] = None
+    ) -> Optional[asyncpg.Record]:
+
+        pool = await self.pool()
+        return await self._timed(
+            name, guild_id, lambda: self._with_backoff(lambda: pool.fetchrow(query, *args)),
+            lambda row: int(row is not None)
+        )
+
+####################################################################################################
+    @asynccontextmanager
+    async def transaction(self) -> AsyncIterator[UnitOfWork]:
+        """Opens a unit of work. Write methods given it via ``uow=`` queue their
+        statement instead of running it, and everything queued is committed as one
+        transaction when the block exits. If the block raises, nothing is sent.
+
+        Consecutive runs of the same statement are sent with ``executemany``, which
+        asyncpg pipelines, so N similar writes don't cost N round trips.
+        """
+
+        uow = UnitOfWork()
+        yield uow
+
+        if not uow.statements:
+            return
+
+        await self._apply_or_journal(uow.statements, lambda: self._commit(uow.statements))
+
+####################################################################################################
+    async def _commit(self, statements: List[JournalStatement]) -> None:
+        """Runs ``statements`` in one transaction, pipelining repeats of a statement."""
+
+        pool = await self.pool()
+
+        async def commit() -> None:
+            async with pool.acquire() as conn:
+                async with conn.transaction():
+                    for query, group in groupby(statements, key=lambda s: s[1]):
+                        batch = list(group)
+                        name, guild_id = batch[0][0], batch[0][3]
+
+                        if len(batch) == 1:
+                            await self._timed(
+                                name, guild_id, lambda: conn.execute(query, *batch[0][2]), _status_rows
+                            )
+                        else:
+                            await self._timed(
+                                name, guild_id,
+                                lambda: conn.executemany(query, [s[2] for s in batch]),
+                                lambda _: 0
+                            )
+
+        await self._with_backoff(commit)
+
+####################################################################################################
+    async def _write(
+        self,
+        uow: Optional[UnitOfWork],
+        name: str,
+        query: str,
+        *args,
+        guild_id: Optional[int] = None
+    ) -> None:
+        """Runs a write now, or queues it on ``uow`` if one is given."""
+
+        if uow is not None:
+            uow.add(name, query, *args, guild_id=guild_id)
+            return
+
+        await self._apply_or_journal(
+            [(name, query, args, guild_id)],
+            lambda: self.execute(name, query, *args, guild_id=guild_id)
+        )
+
+####################################################################################################
+    async def _apply_or_journal(
+        self, statements: List[JournalStatement], apply: Callable[[], Awaitable[Any]]
+    ) -> None:
+        """Applies a write, or journals it if the database can't be reached. Writes
+        also go straight to the journal while it holds anything, so they can't
+        overtake older writes still waiting to be replayed."""
+
+        if not len(write_journal):
+            try:
+                await apply()
+                return
+            except Exception as error:
+                if not _is_connection_error(error):
+                    raise
+                print(f"Database unreachable ({type(error).__name__}), journaling write.")
+
+        await write_journal.append(statements)
+
+####################################################################################################
+    async def replay_journal(self) -> int:
+        """Applies journaled writes in order, each in its own transaction. Every
+        entry is recorded in ``write_journal_applied`` in the same transaction, so an
+        entry replayed again after a crash is skipped.
+
+        Replay stops at a connection error and resumes from there next time. An entry
+        the database rejects for any other reason would block every later write, so
+        it's moved to the dead-letter file and skipped.
+
+        Returns:
+        --------
+        :class:`int`
+            The number of journal entries cleared.
+        """
+
+        async with self._replay_lock:
+            entries = write_journal.durable_entries
+            if not entries:
+                return 0
+
+            done = 0
+            dead = 0
+
+            try:
+                pool = await self.pool()
+                for entry in entries:
+                    try:
+                        await self._replay_entry(pool, entry)
+                    except Exception as error:
+                        if _is_connection_error(error):
+                            raise
+
+                        await write_journal.dead_letter(entry, error)
+                        dead += 1
+                        print(f"Moved journaled write {entry['id']} to the dead-letter file ({error!r})")
+                    done += 1
+            except Exception as error:
+                print(f"Write journal replay stopped after {done}/{len(entries)} ({error!r})")
+            finally:
+                await write_journal.discard(done)
+
+            if done > dead:
+                print(f"Replayed {done - dead} journaled write(s).")
+
+                # Entries this old are long gone from every journal. Best-effort; the
+                # next replay tries again.
+                try:
+                    await self.execute(
+                        "prune_write_journal_applied",
+                        "DELETE FROM write_journal_applied WHERE applied_at < now() - interval '30 days'"
+                    )
+                except Exception as error:
+                    print(f"Failed pruning applied journal entries ({error!r})")
+
+            # Reloads postponed by `drain_journal` can read the database now.
+            if self._resync_pending and not len(write_journal):
+                self._resync_listeners()
+
+            return done
+
+####################################################################################################
+    async def _replay_entry(self, pool: asyncpg.Pool, entry: Dict[str, Any]) -> None:
+
+        async with pool.acquire() as conn:
+            async with conn.transaction():
+                status = await conn.execute(
+                    "INSERT INTO write_journal_applied (entry_id) VALUES ($1) "
+                    "ON CONFLICT DO NOTHING",
+                    entry["id"]
+                )
+                if _status_rows(status):
+                    for name, query, args, guild_id in entry["statements"]:
+                        await self._timed(
+                            name, guild_id, lambda: conn.execute(query, *args), _status_rows
+                        )
+
+####################################################################################################
+    async def drain_journal(self) -> bool:
+        """Replays any journaled writes now, rather than waiting for the replay loop.
+
+        Returns:
+        --------
+        :class:`bool`
+            Whether the journal is empty, i.e. the database holds every write this
+            process has made. Config read from it otherwise would be out of date.
+        """
+
+        if len(write_journal):
+            try:
+                await self.replay_journal()
+            except Exception as error:
+                print(f"Write journal replay failed ({error!r})")
+
+        if len(write_journal):
+            # Whoever asked can't read yet; they're resynced once the journal empties.
+            self._resync_pending = True
+            return False
+
+        return True
+
+####################################################################################################
+    async def _replay_loop(self) -> None:
+
+        interval = _env_number("WRITE_JOURNAL_REPLAY_INTERVAL", 5.0, float)
+
+        while True:
+            await asyncio.sleep(interval)
+
+            if not len(write_journal):
+                continue
+
+            # The loop is the only thing that retries on its own, so it mustn't die.
+            try:
+                await self.replay_journal()
+            except Exception as error:
+                print(f"Write journal replay failed ({error!r})")
+
+####################################################################################################
+    async def assert_guild_entries(self, guild_ids: Sequence[int]) -> None:
+        """Creates new records in all guild ID-dependant tables for any of the
+        given guilds that don't have them yet, in a single statement.
+        """
+
+        await self.execute(
+            "assert_guild_entries",
+            "INSERT INTO job_postings (guild_id) SELECT unnest($1::bigint[]) "
+            "ON CONFLICT (guild_id) DO NOTHING",
+            list(guild_ids)
+        )
+
+####################################################################################################
+    async def fetch_guild_records(self, guild_ids: Sequence[int]) -> Dict[int, GuildRecords]:
+        """Fetches the stored configuration of every given guild using one query
+        per table, rather than one round trip per guild per table.
+        """
+
+        guild_ids = list(guild_ids)
+        records = {guild_id: GuildRecords(None, [], []) for guild_id in guild_ids}
+        single = guild_ids[0] if len(guild_ids) == 1 else None
+
+        postings = await self.fetch(
+            "fetch_guild_records.postings",
+            "SELECT guild_id, sources, destinations FROM job_postings "
+            "WHERE guild_id = ANY($1::bigint[])",
+            guild_ids, guild_id=single
+        )
+        for row in postings:
+            records[row["guild_id"]] = records[row["guild_id"]]._replace(postings=row)
+
+        tags = await self.fetch(
+            "fetch_guild_records.tags",
+            "SELECT guild_id, channel_id, role_ids, tag_id FROM job_tags "
+            "WHERE guild_id = ANY($1::bigint[])",
+            guild_ids, guild_id=single
+        )
+        for row in tags:
+            records[row["guild_id"]].tags.append(row)
+
+        stats = await self.fetch(
+            "fetch_guild_records.stats",
+            "SELECT role_id, guild_id, count FROM job_stats "
+            "WHERE guild_id = ANY($1::bigint[])",
+            guild_ids, guild_id=single
+        )
+        for row in stats:
+            records[row["guild_id"]].stats.append(row)
+
+        return records
+
+####################################################################################################
+    async def fetch_configured_guilds(self, guild_ids: Sequence[int]) -> Set[int]:
+        """Returns which of the given guilds have any crossposting config at all,
+        without reading the config itself."""
+
+        rows = await self.fetch(
+            "fetch_configured_guilds",
+            "SELECT guild_id FROM job_postings WHERE guild_id = ANY($1::bigint[]) "
+            "AND (cardinality(sources) > 0 OR cardinality(destinations) > 0) "
+            "UNION "
+            "SELECT DISTINCT guild_id FROM job_tags WHERE guild_id = ANY($1::bigint[])",
+            list(guild_ids)
+        )
+
+        return {row["guild_id"] for row in rows}
+
+####################################################################################################
+    async def fetch_active_guilds(self, guild_ids: Sequence[int], days: int, limit: int) -> List[int]:
+        """Returns up to ``limit`` of the given guilds with the most crossposts in the
+        last ``days`` days, busiest first, read from the daily rollup."""
+
+        rows = await self.fetch(
+            "fetch_active_guilds",
+            "SELECT guild_id FROM crosspost_daily "
+            "WHERE guild_id = ANY($1::bigint[]) AND dimension = 'all' "
+            "AND bucket >= (now() AT TIME ZONE 'UTC')::date - $2::int "
+            "GROUP BY guild_id ORDER BY sum(posts) DESC LIMIT $3",
+            list(guild_ids), days, limit
+        )
+
+        return [row["guild_id"] for row in rows]
+
+####################################################################################################
+    async def update_job_postings(
+        self,
+        guild_id: int,
+        source_ids: Sequence[int],
+        post_ids: Sequence[int],
+        *,
+        uow: Optional[UnitOfWork] = None
+    ) -> None:
+        """Stores the guild's source and destination channels, creating its row if needed."""
+
+        await self._write(
+            uow, "update_job_postings",
+            "INSERT INTO job_postings (guild_id, sources, destinations) "
+            "VALUES ($3, $1::bigint[], $2::bigint[]) "
+            "ON CONFLICT (guild_id) DO UPDATE "
+            "SET sources = EXCLUDED.sources, destinations = EXCLUDED.destinations",
+            source_ids, post_ids, guild_id, guild_id=guild_id
+        )
+
+####################################################################################################
+    async def add_job_tag_role(
+        self,
+        guild_id: int,
+        role_id: int,
+        keys: Sequence[Tuple[int, int]],
+        *,
+        uow: Optional[UnitOfWork] = None
+    ) -> None:
+        """Appends ``role_id`` to the role array of each ``(channel_id, tag_id)`` tag,
+        creating rows for tags that aren't stored yet, in a single statement.
+        Tags that already hold the role are left untouched.
+        """
+
+        if not keys:
+            return
+
+        channel_ids, tag_ids = (list(column) for column in zip(*keys))
+
+        await self._write(
+            uow, "add_job_tag_role",
+            "INSERT INTO job_tags (guild_id, channel_id, tag_id, role_ids) "
+            "SELECT DISTINCT $1::bigint, k.channel_id, k.tag_id, ARRAY[$4::bigint] "
+            "FROM unnest($2::bigint[], $3::bigint[]) AS k (channel_id, tag_id) "
+            "ON CONFLICT (guild_id, channel_id, tag_id) DO UPDATE "
+            "SET role_ids = array_append(job_tags.role_ids, $4::bigint) "
+            "WHERE NOT $4::bigint = ANY(job_tags.role_ids)",
+            guild_id, channel_ids, tag_ids, role_id, guild_id=guild_id
+        )
+
+####################################################################################################
+    async def remove_job_tag_role(
+        self,
+        guild_id: int,
+        role_id: int,
+        keys: Sequence[Tuple[int, int]],
+        *,
+        uow: Optional[UnitOfWork] = None
+    ) -> None:
+        """Removes ``role_id`` from the role array of each ``(channel_id, tag_id)`` tag
+        in a single statement. Tags left without any roles are deleted.
+        """
+
+        if not keys:
+            return
+
+        channel_ids, tag_ids = (list(column) for column in zip(*keys))
+
+        # Both halves see the same snapshot and match disjoint rows, so a tag is
+        # either emptied (and deleted) or has the role removed, never both.
+        await self._write(
+            uow, "remove_job_tag_role",
+            "WITH k (channel_id, tag_id) AS ("
+            "    SELECT * FROM unnest($2::bigint[], $3::bigint[])"
+            "), emptied AS ("
+            "    DELETE FROM job_tags t USING k"
+            "    WHERE t.guild_id = $1 AND t.channel_id = k.channel_id AND t.tag_id = k.tag_id"
+            "    AND t.role_ids <@ ARRAY[$4::bigint]"
+            ") "
+            "UPDATE job_tags t SET role_ids = array_remove(t.role_ids, $4::bigint) "
+            "FROM k WHERE t.guild_id = $1 AND t.channel_id = k.channel_id AND t.tag_id = k.tag_id "
+            "AND NOT t.role_ids <@ ARRAY[$4::bigint]",
+            guild_id, channel_ids, tag_ids, role_id, guild_id=guild_id
+        )
+
+####################################################################################################
+    async def delete_job_tags(
+        self,
+        guild_id: int,
+        channel_id: int,
+        *,
+        keep: Sequence[int] = (),
+        uow: Optional[UnitOfWork] = None
+    ) -> None:
+        """Deletes every tag mapping in the given forum, except those whose tag ID is in ``keep``."""
+
+        await self._write(
+            uow, "delete_job_tags",
+            "DELETE FROM job_tags WHERE guild_id = $1 AND channel_id = $2 "
+            "AND NOT tag_id = ANY($3::bigint[])",
+            guild_id, channel_id, list(keep), guild_id=guild_id
+        )
+
+####################################################################################################
+    async def add_job_stats(self, batch_id: str, deltas: Sequence[Tuple[int, int, int]]) -> None:
+        """Atomically adds each ``(guild_id, role_id, amount)`` delta to its
+        role's posting count, creating missing rows, in a single statement.
+        Each pair may only appear once per call.
+
+        Increments aren't idempotent, so the same statement claims ``batch_id`` in
+        ``write_journal_applied`` and only applies the deltas if the claim is new.
+        A batch retried or replayed after its commit was already made, such as when
+        the connection drops mid-commit, is then counted once.
+        """
+
+        if not deltas:
+            return
+
+        guild_ids, role_ids, amounts = (list(column) for column in zip(*deltas))
+
+        await self._write(
+            None, "add_job_stats",
+            "WITH claimed AS ("
+            "    INSERT INTO write_journal_applied (entry_id) VALUES ($4) "
+            "    ON CONFLICT DO NOTHING RETURNING 1"
+            ") "
+            "INSERT INTO job_stats (guild_id, role_id, count) "
+            "SELECT * FROM unnest($1::bigint[], $2::bigint[], $3::bigint[]) "
+            "WHERE EXISTS (SELECT 1 FROM claimed) "
+            "ON CONFLICT (guild_id, role_id) DO UPDATE SET count = job_stats.count + EXCLUDED.count",
+            guild_ids, role_ids, amounts, batch_id
+        )
+
+####################################################################################################
+    async def insert_crosspost_events(
+        self, batch_id: str, events: Sequence[Tuple[int, int, int, List[int], List[int], datetime]]
+    ) -> None:
+        """Appends ``(guild_id, thread_id, channel_id, tag_ids, role_ids, posted_at)``
+        events to the crosspost log using a single ``COPY``.
+
+        ``batch_id`` is claimed in ``write_journal_applied`` in the same transaction,
+        so a batch retried after its commit was already made isn't logged twice.
+        """
+
+        if not events:
+            return
+
+        pool = await self.pool()
+
+        async def copy() -> str:
+            async with pool.acquire() as conn:
+                async with conn.transaction():
+                    claimed = await conn.execute(
+                        "INSERT INTO write_journal_applied (entry_id) VALUES ($1) "
+                        "ON CONFLICT DO NOTHING",
+                        batch_id
+                    )
+                    if not _status_rows(claimed):
+                        return "COPY 0"
+
+                    return await conn.copy_records_to_table(
+                        "crosspost_events",
+                        records=events,
+                        columns=("guild_id", "thread_id", "channel_id", "tag_ids", "role_ids", "posted_at")
+                    )
+
+        await self._timed(
+            "insert_crosspost_events", None, lambda: self._with_backoff(copy), _status_rows
+        )
+
+####################################################################################################
+    async def roll_up_crosspost_events(self) -> int:
+        """Folds every not-yet-rolled-up event into the hourly and daily rollups
+        and marks it as rolled up, all in one statement, so each event is counted
+        exactly once even if two instances run this at the same time.
+
+        Returns:
+        --------
+        :class:`int`
+            The number of events folded.
+        """
+
+        row = await self.fetchrow(
+            "roll_up_crosspost_events",
+            "WITH folded AS ("
+            "    UPDATE crosspost_events SET rolled_up = true WHERE NOT rolled_up"
+            "    RETURNING guild_id, posted_at AT TIME ZONE 'UTC' AS posted_at, tag_ids, role_ids"
+            "), dims AS ("
+            "    SELECT guild_id, posted_at, 'all' AS dimension, 0::bigint AS dim_id FROM folded"
+            "    UNION ALL SELECT guild_id, posted_at, 'tag', unnest(tag_ids) FROM folded"
+            "    UNION ALL SELECT guild_id, posted_at, 'role', unnest(role_ids) FROM folded"
+            "), hourly AS ("
+            "    INSERT INTO crosspost_hourly (guild_id, dimension, dim_id, bucket, posts)"
+            "    SELECT guild_id, dimension, dim_id, date_trunc('hour', posted_at), count(*)"
+            "    FROM dims GROUP BY 1, 2, 3, 4"
+            "    ON CONFLICT (guild_id, dimension, dim_id, bucket)"
+            "    DO UPDATE SET posts = crosspost_hourly.posts + EXCLUDED.posts"
+            "), daily AS ("
+            "    INSERT INTO crosspost_daily (guild_id, dimension, dim_id, bucket, posts)"
+            "    SELECT guild_id, dimension, dim_id, posted_at::date, count(*)"
+            "    FROM dims GROUP BY 1, 2, 3, 4"
+            "    ON CONFLICT (guild_id, dimension, dim_id, bucket)"
+            "    DO UPDATE SET posts = crosspost_daily.posts + EXCLUDED.posts"
+            ") "
+            "SELECT count(*) FROM folded"
+        )
+
+        return row[0] if row is not None else 0
+
+####################################################################################################
+    async def prune_crosspost_events(self, event_days: int, hourly_days: int) -> None:
+        """Drops rolled-up events older than ``event_days`` and hourly rollups
+        older than ``hourly_days``. Daily rollups are kept indefinitely."""
+
+        async with self.transaction() as uow:
+            uow.add(
+                "prune_crosspost_events",
+                "DELETE FROM crosspost_events WHERE rolled_up "
+                "AND posted_at < now() - make_interval(days => $1)",
+                event_days
+            )
+            uow.add(
+                "prune_crosspost_hourly",
+                "DELETE FROM crosspost_hourly "
+                "WHERE bucket < (now() AT TIME ZONE 'UTC') - make_interval(days => $1)",
+                hourly_days
+            )
+
+####################################################################################################
+    async def fetch_crosspost_totals(
+        self, guild_id: int, dimension: str, since: date
+    ) -> List[asyncpg.Record]:
+        """Returns ``(dim_id, posts)`` rows summed from the daily rollup since ``since`` (UTC)."""
+
+        return await self.fetch(
+            "fetch_crosspost_totals",
+            "SELECT dim_id, sum(posts)::bigint AS posts FROM crosspost_daily "
+            "WHERE guild_id = $1 AND dimension = $2 AND bucket >= $3 "
+            "GROUP BY dim_id ORDER BY posts DESC",
+            guild_id, dimension, since, guild_id=guild_id
+        )
+
+####################################################################################################
+    async def fetch_crosspost_hours(self, guild_id: int, since: datetime) -> List[asyncpg.Record]:
+        """Returns ``(hour, posts)`` rows, the UTC hour of day and the posts made in
+        it since ``since``, summed from the hourly rollup."""
+
+        return await self.fetch(
+            "fetch_crosspost_hours",
+            "SELECT extract(hour FROM bucket)::int AS hour, sum(posts)::bigint AS posts "
+            "FROM crosspost_hourly "
+            "WHERE guild_id = $1 AND dimension = 'all' AND bucket >= $2 "
+            "GROUP BY 1 ORDER BY posts DESC",
+            guild_id, since, guild_id=guild_id
+        )
+
+####################################################################################################
+# The shared data-access instance. No connection is opened until `connect()` is called.
 
-    return
+db = Database()
 
 ####################################################################################################
@@ -7,6 +7,7 @@ from assets     import BotImages
 
 __all__ = (
     "ChannelTypeError",
+    "GuildNotLoaded",
     "SourceTagNotFound",
     "MappingNotFound"
 )
@@ -140,5 +141,33 @@ class MappingNotFound(ErrorMessage):
             message="The forum tag/role map combination you specified hasn't been created yet.",
             solution="Use </jobs map_role:1073421413924483092> to create a new mapping."
         )
+####################################################################################################
+class GuildNotLoaded(ErrorMessage):
+    """An error message informing the user that the bot hasn't finished
+    loading the configuration for their server yet.
+
+    Overview:
+    ---------
+    Title:
+        "Server Not Loaded"
+
+    Description:
+        [None]
+
+    Message:
+        "Kino Ki hasn't finished loading the configuration for this server."
+
+    Solution:
+        "Wait a moment and try the command again."
+
+    """
+
+    def __init__(self):
+
+        super().__init__(
+            title="Server Not Loaded",
+            message="Kino Ki hasn't finished loading the configuration for this server.",
+            solution="Wait a moment and try the command again."
+        )
 
 ####################################################################################################
@@ -0,0 +1,217 @@
+from __future__ import annotations
+
+import asyncio
+import json
+import os
+import uuid
+
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+####################################################################################################
+
+__all__ = ("WriteJournal", "write_journal")
+
+# One queued statement: (name, query, args, guild_id).
+JournalStatement = Tuple[str, str, Sequence[Any], Optional[int]]
+
+####################################################################################################
+class WriteJournal:
+    """An append-only local file of database writes that couldn't be applied
+    because the database was unreachable, kept until they've been replayed.
+
+    Each entry is one JSON line holding the statements of a single write or
+    transaction. Appends are written and ``fsync``-ed in groups: callers wait
+    until the group holding their entry is on disk, so many writes made
+    together share one ``fsync``. Only entries already on disk are handed out
+    for replay.
+
+    Environment Variables:
+    ----------------------
+    WRITE_JOURNAL_PATH:
+        File the journal is kept in. Defaults to ``data/write_journal.jsonl``.
+        It must be on storage that survives a restart for the journal to be durable.
+
+    WRITE_JOURNAL_FSYNC_INTERVAL:
+        Seconds appends are gathered for before being written out together. Defaults to ``0.05``.
+
+    WRITE_JOURNAL_DEAD_LETTER_PATH:
+        File entries the database rejected are moved to, for inspection by hand.
+        Defaults to ``data/write_journal.dead.jsonl``.
+    """
+
+    __slots__ = (
+        "_path",
+        "_interval",
+        "_entries",
+        "_durable",
+        "_buffer",
+        "_waiters",
+        "_flush_task",
+        "_lock"
+    )
+
+####################################################################################################
+    def __init__(self):
+
+        self._path: Optional[str] = None
+        self._interval: float = 0.05
+
+        self._entries: List[Dict[str, Any]] = []
+        self._durable: int = 0
+        self._buffer: List[Dict[str, Any]] = []
+        self._waiters: List[asyncio.Future] = []
+
+        self._flush_task: Optional[asyncio.Task] = None
+        self._lock: asyncio.Lock = asyncio.Lock()
+
+####################################################################################################
+    def __len__(self) -> int:
+
+        return len(self._entries)
+
+####################################################################################################
+    @property
+    def durable_entries(self) -> List[Dict[str, Any]]:
+        """The entries already on disk, oldest first."""
+
+        return self._entries[:self._durable]
+
+####################################################################################################
+    async def open(self, path: Optional[str] = None) -> None:
+        """Loads whatever was left in the journal file by a previous run."""
+
+        if self._path is not None:
+            return
+
+        self._path = path or os.environ.get("WRITE_JOURNAL_PATH", "data/write_journal.jsonl")
+        self._interval = float(os.environ.get("WRITE_JOURNAL_FSYNC_INTERVAL", self._interval))
+
+        self._entries = await asyncio.to_thread(self._read, self._path)
+        self._durable = len(self._entries)
+
+        if self._entries:
+            print(f"Write journal holds {len(self._entries)} write(s) awaiting replay.")
+
+####################################################################################################
+    async def append(self, statements: Sequence[JournalStatement]) -> None:
+        """Adds one entry and waits until it's durably on disk."""
+
+        if self._path is None:
+            await self.open()
+
+        entry = {
+            "id": uuid.uuid4().hex,
+            "statements": [list(statement) for statement in statements]
+        }
+        self._entries.append(entry)
+        self._buffer.append(entry)
+
+        waiter = asyncio.get_running_loop().create_future()
+        self._waiters.append(waiter)
+
+        if self._flush_task is None or self._flush_task.done():
+            self._flush_task = asyncio.create_task(self._flush())
+
+        await waiter
+
+####################################################################################################
+    async def discard(self, count: int) -> None:
+        """Drops the ``count`` oldest entries once they've been replayed, rewriting
+        the file atomically so a crash can't leave it half-truncated."""
+
+        if count <= 0:
+            return
+
+        async with self._lock:
+            count = min(count, self._durable)
+            self._entries = self._entries[count:]
+            self._durable -= count
+
+            lines = [json.dumps(entry) for entry in self._entries[:self._durable]]
+            await asyncio.to_thread(self._rewrite, self._path, lines)
+
+####################################################################################################
+    async def dead_letter(self, entry: Dict[str, Any], error: BaseException) -> None:
+        """Records an entry that can never be applied, along with why, so it can be
+        dropped from the journal without losing it."""
+
+        path = os.environ.get("WRITE_JOURNAL_DEAD_LETTER_PATH", "data/write_journal.dead.jsonl")
+        line = json.dumps({**entry, "error": repr(error)})
+
+        await asyncio.to_thread(self._write, path, [line])
+
+####################################################################################################
+    async def _flush(self) -> None:
+
+        # Give concurrent writers a moment to join this group.
+        await asyncio.sleep(self._interval)
+
+        async with self._lock:
+            batch, self._buffer = self._buffer, []
+            waiters, self._waiters = self._waiters, []
+
+            try:
+                await asyncio.to_thread(self._write, self._path, [json.dumps(e) for e in batch])
+            except Exception as error:
+                # The callers see the error, so these writes must not be replayed later.
+                failed = {id(entry) for entry in batch}
+                self._entries = [entry for entry in self._entries if id(entry) not in failed]
+
+                print(f"Failed writing {len(batch)} write(s) to the journal: {error!r}")
+                for waiter in waiters:
+                    if not waiter.done():
+                        waiter.set_exception(error)
+                return
+
+            self._durable += len(batch)
+
+        for waiter in waiters:
+            if not waiter.done():
+                waiter.set_result(None)
+
+####################################################################################################
+    @staticmethod
+    def _read(path: str) -> List[Dict[str, Any]]:
+
+        if not os.path.exists(path):
+            return []
+
+        entries = []
+        with open(path, "r") as journal:
+            for line in journal:
+                try:
+                    entries.append(json.loads(line))
+                except ValueError:
+                    # Only the final line can be torn, by a crash mid-append.
+                    break
+
+        return entries
+
+####################################################################################################
+    @staticmethod
+    def _write(path: str, lines: List[str]) -> None:
+
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+
+        with open(path, "a") as journal:
+            journal.write("".join(f"{line}\n" for line in lines))
+            journal.flush()
+            os.fsync(journal.fileno())
+
+####################################################################################################
+    @staticmethod
+    def _rewrite(path: str, lines: List[str]) -> None:
+
+        temp = f"{path}.tmp"
+        with open(temp, "w") as journal:
+            journal.write("".join(f"{line}\n" for line in lines))
+            journal.flush()
+            os.fsync(journal.fileno())
+
+        os.replace(temp, path)
+
+####################################################################################################
+# The shared journal, used by the data-access layer while the database is unreachable.
+
+write_journal = WriteJournal()
+
+####################################################################################################
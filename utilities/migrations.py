@@ -0,0 +1,93 @@
+from __future__ import annotations
+
+import os
+import re
+
+from pathlib    import Path
+from typing     import List, Tuple
+
+from .database  import db
+####################################################################################################
+
+__all__ = ("apply_migrations", )
+
+MIGRATIONS_DIR = Path(__file__).resolve().parent.parent / "migrations"
+MIGRATION_FILE = re.compile(r"^(\d+)_(\w+)\.sql$")
+
+# Arbitrary key for the advisory lock that keeps two instances from migrating at once.
+MIGRATION_LOCK = 0x4B494E4F
+
+####################################################################################################
+def discover_migrations(directory: Path = MIGRATIONS_DIR) -> List[Tuple[int, str, Path]]:
+    """Returns every ``NNNN_name.sql`` file in ``directory`` as
+    ``(version, name, path)``, ordered by version."""
+
+    found = []
+    for path in directory.glob("*.sql"):
+        match = MIGRATION_FILE.match(path.name)
+        if match is not None:
+            found.append((int(match.group(1)), match.group(2), path))
+
+    return sorted(found)
+
+####################################################################################################
+async def apply_migrations(directory: Path = MIGRATIONS_DIR) -> List[int]:
+    """Brings the database schema up to date.
+
+    Each migration that isn't recorded in ``schema_version`` yet is run in its own
+    transaction, together with the insert that records it, so a failed migration
+    leaves neither a half-applied schema nor a version entry behind.
+
+    Environment Variables:
+    ----------------------
+    DATABASE_MIGRATION_TIMEOUT:
+        Seconds a single migration may run. Defaults to ``300``, since
+        rewriting a large table can outlast the normal statement timeout.
+
+    Returns:
+    --------
+    List[:class:`int`]
+        The versions applied by this call.
+    """
+
+    timeout = float(os.environ.get("DATABASE_MIGRATION_TIMEOUT", 300))
+    applied: List[int] = []
+
+    pool = await db.pool()
+    async with pool.acquire() as conn:
+        # Another instance may hold the lock for as long as its migrations run, so
+        # the wait gets the migration timeout rather than the pool's. The lock is
+        # session-level and outlives the transaction used to scope the timeout.
+        async with conn.transaction():
+            await conn.execute(f"SET LOCAL statement_timeout = {int(timeout * 1000)}")
+            await conn.execute("SELECT pg_advisory_lock($1)", MIGRATION_LOCK, timeout=timeout)
+        try:
+            await conn.execute(
+                "CREATE TABLE IF NOT EXISTS schema_version ("
+                "    version     integer     PRIMARY KEY,"
+                "    name        text        NOT NULL,"
+                "    applied_at  timestamptz NOT NULL DEFAULT now()"
+                ")"
+            )
+            done = {r["version"] for r in await conn.fetch("SELECT version FROM schema_version")}
+
+            for version, name, path in discover_migrations(directory):
+                if version in done:
+                    continue
+
+                async with conn.transaction():
+                    await conn.execute(f"SET LOCAL statement_timeout = {int(timeout * 1000)}")
+                    await conn.execute(path.read_text(), timeout=timeout)
+                    await conn.execute(
+                        "INSERT INTO schema_version (version, name) VALUES ($1, $2)",
+                        version, name
+                    )
+
+                applied.append(version)
+                print(f"Applied database migration: {path.name}")
+        finally:
+            await conn.execute("SELECT pg_advisory_unlock($1)", MIGRATION_LOCK)
+
+    return applied
+
+####################################################################################################
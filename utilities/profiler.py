@@ -0,0 +1,231 @@
+from __future__ import annotations
+
+import cProfile
+import json
+import math
+import os
+import time
+
+from contextlib import contextmanager
+from typing     import Any, Dict, Iterator, Optional, Tuple
+####################################################################################################
+
+__all__ = ("BootProfiler", "boot_profiler")
+
+####################################################################################################
+class BootProfiler:
+    """Times the phases of a single startup, from the first import in ``main.py``
+    to the end of the initial guild load, and reports them once it's finished.
+
+    Phases may nest; each is reported with its offset from the start of the boot
+    and its depth. Per-guild load times are collected alongside. Anything timed
+    after :meth:`finish` is ignored, so the same code paths can run later without
+    cost.
+
+    Environment Variables:
+    ----------------------
+    BOOT_REPORT_PATH:
+        File the JSON boot report is written to. Defaults to ``data/boot_report.json``.
+
+    BOOT_PROFILE_PATH:
+        If set, the initial guild load is run under :mod:`cProfile` and the stats
+        are dumped to this file, for ``python -m pstats`` or snakeviz.
+
+    BOOT_BUDGET_SECONDS:
+        If set, the boot is flagged as over budget in the log and the report
+        when it takes longer than this.
+    """
+
+    __slots__ = (
+        "_origin",
+        "_phases",
+        "_open",
+        "_guilds",
+        "_profile",
+        "_finished"
+    )
+
+####################################################################################################
+    def __init__(self):
+
+        self._origin: float = time.perf_counter()
+        # name -> (start, end, depth); the end is None while the phase is open.
+        self._phases: Dict[str, Tuple[float, Optional[float], int]] = {}
+        self._open: int = 0
+        self._guilds: Dict[int, float] = {}
+
+        self._profile: Optional[cProfile.Profile] = None
+        self._finished: bool = False
+
+####################################################################################################
+    @property
+    def active(self) -> bool:
+        """Whether the boot is still being timed."""
+
+        return not self._finished
+
+####################################################################################################
+    def start(self, origin: Optional[float] = None) -> None:
+        """Sets the moment the boot is measured from, as a :func:`time.perf_counter`
+        value. Defaults to when this module was imported."""
+
+        if origin is not None:
+            self._origin = origin
+
+####################################################################################################
+    def begin(self, name: str) -> None:
+        """Opens a phase that ends in a different place than it starts, closed by :meth:`end`."""
+
+        if self._finished:
+            return
+
+        self._phases[name] = (time.perf_counter(), None, self._open)
+        self._open += 1
+
+####################################################################################################
+    def end(self, name: str) -> None:
+
+        if self._finished or name not in self._phases:
+            return
+
+        start, end, depth = self._phases[name]
+        if end is None:
+            self._phases[name] = (start, time.perf_counter(), depth)
+            self._open -= 1
+
+####################################################################################################
+    @contextmanager
+    def phase(self, name: str) -> Iterator[None]:
+        """Times the body of a ``with`` block as one phase."""
+
+        self.begin(name)
+        try:
+            yield
+        finally:
+            self.end(name)
+
+####################################################################################################
+    def record(self, name: str, start: float, end: float) -> None:
+        """Adds a phase that has already happened, such as the imports made before
+        this module could be imported."""
+
+        if not self._finished:
+            self._phases[name] = (start, end, self._open)
+
+####################################################################################################
+    def record_guild(self, guild_id: int, seconds: float) -> None:
+
+        if not self._finished:
+            self._guilds[guild_id] = seconds
+
+####################################################################################################
+    def profile_start(self) -> None:
+        """Starts :mod:`cProfile` if ``BOOT_PROFILE_PATH`` is set. Note that it
+        profiles everything the event loop runs meanwhile, not just one task."""
+
+        if self._finished or self._profile is not None or not os.environ.get("BOOT_PROFILE_PATH"):
+            return
+
+        self._profile = cProfile.Profile()
+        self._profile.enable()
+
+####################################################################################################
+    def profile_stop(self) -> None:
+
+        if self._profile is None:
+            return
+
+        self._profile.disable()
+        self._profile.dump_stats(os.environ["BOOT_PROFILE_PATH"])
+        print(f"Boot profile written to {os.environ['BOOT_PROFILE_PATH']}")
+
+        self._profile = None
+
+####################################################################################################
+    def report(self) -> Dict[str, Any]:
+        """Returns the boot timings collected so far as JSON-serializable data."""
+
+        now = time.perf_counter()
+        total = now - self._origin
+
+        phases = [
+            {
+                "name": name,
+                "start": round(start - self._origin, 4),
+                "seconds": round((end if end is not None else now) - start, 4),
+                "depth": depth,
+                "finished": end is not None
+            }
+            for name, (start, end, depth) in sorted(self._phases.items(), key=lambda p: p[1][0])
+        ]
+
+        ordered = sorted(self._guilds.values())
+
+        def percentile(p: float) -> float:
+            return round(ordered[max(0, math.ceil(p * len(ordered)) - 1)], 4) if ordered else 0.0
+
+        budget = os.environ.get("BOOT_BUDGET_SECONDS")
+
+        return {
+            "total": round(total, 4),
+            "budget": float(budget) if budget else None,
+            "within_budget": total <= float(budget) if budget else None,
+            "phases": phases,
+            "guilds": {
+                "count": len(ordered),
+                "p50": percentile(0.50),
+                "p95": percentile(0.95),
+                "max": percentile(1.0),
+                "seconds": {str(k): round(v, 4) for k, v in self._guilds.items()}
+            }
+        }
+
+####################################################################################################
+    def finish(self) -> Optional[Dict[str, Any]]:
+        """Ends the boot: stops any profile, prints the report and writes it to
+        ``BOOT_REPORT_PATH``. Only the first call does anything."""
+
+        if self._finished:
+            return None
+
+        self.profile_stop()
+        report = self.report()
+        self._finished = True
+
+        print("========================================")
+        print(f"Boot finished in {report['total'] * 1000:.0f}ms")
+        for phase in report["phases"]:
+            print(
+                f"{'  ' * (phase['depth'] + 1)}{phase['name']}: {phase['seconds'] * 1000:.0f}ms "
+                f"(at +{phase['start'] * 1000:.0f}ms)"
+                f"{'' if phase['finished'] else ' (still running)'}"
+            )
+
+        guilds = report["guilds"]
+        if guilds["count"]:
+            slowest = sorted(self._guilds.items(), key=lambda item: item[1], reverse=True)[:5]
+            print(
+                f"  {guilds['count']} guild load(s) || p50: {guilds['p50'] * 1000:.0f}ms || "
+                f"p95: {guilds['p95'] * 1000:.0f}ms || slowest: "
+                + ", ".join(f"{guild_id} ({seconds * 1000:.0f}ms)" for guild_id, seconds in slowest)
+            )
+
+        if report["within_budget"] is False:
+            print(f"Boot is OVER BUDGET: {report['total']:.2f}s against {report['budget']:g}s")
+
+        path = os.environ.get("BOOT_REPORT_PATH", "data/boot_report.json")
+        try:
+            os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+            with open(path, "w") as file:
+                json.dump(report, file, indent=2)
+        except OSError as error:
+            print(f"Failed writing boot report: {error!r}")
+
+        return report
+
+####################################################################################################
+# The profiler for this process's startup, begun from `main.py`.
+
+boot_profiler = BootProfiler()
+
+####################################################################################################
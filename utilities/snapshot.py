@@ -0,0 +1,219 @@
+from __future__ import annotations
+
+import asyncio
+import json
+import os
+
+from typing import Any, Callable, Dict, Optional
+####################################################################################################
+
+__all__ = ("ConfigSnapshot", "config_snapshot")
+
+####################################################################################################
+class ConfigSnapshot:
+    """A versioned on-disk copy of every guild's crossposting config, so a
+    restarted bot can start crossposting before the database has been read.
+
+    The file is rewritten atomically shortly after every config change (see
+    :meth:`changed`), and also checked every ``interval`` seconds, but only
+    written when its contents would change. A file written by a different
+    :attr:`VERSION` is ignored rather than guessed at.
+
+    Environment Variables:
+    ----------------------
+    CONFIG_SNAPSHOT_PATH:
+        File the snapshot is kept in. Defaults to ``data/config_snapshot.json``.
+
+    CONFIG_SNAPSHOT_INTERVAL:
+        Seconds between checks for changes to write out. Defaults to ``30``.
+
+    CONFIG_SNAPSHOT_DELAY:
+        Seconds a change waits before being written, so a burst of changes
+        costs one write. Defaults to ``1``.
+    """
+
+    VERSION: int = 1
+
+    __slots__ = (
+        "_path",
+        "_guilds",
+        "_written",
+        "_collect",
+        "_task",
+        "_pending",
+        "_dirty",
+        "_settled",
+        "_lock"
+    )
+
+####################################################################################################
+    def __init__(self):
+
+        self._path: Optional[str] = None
+        self._guilds: Dict[int, Dict[str, Any]] = {}
+        self._written: Optional[str] = None
+
+        self._collect: Optional[Callable[[], Dict[int, Optional[Dict[str, Any]]]]] = None
+        self._task: Optional[asyncio.Task] = None
+        self._pending: Optional[asyncio.Task] = None
+        self._dirty: bool = False
+        self._settled: bool = False
+        self._lock: asyncio.Lock = asyncio.Lock()
+
+####################################################################################################
+    def get(self, guild_id: int) -> Optional[Dict[str, Any]]:
+        """Returns the snapshotted config of the given guild, if there is one."""
+
+        return self._guilds.get(guild_id)
+
+####################################################################################################
+    async def open(self, path: Optional[str] = None) -> None:
+        """Reads the snapshot left by the previous run."""
+
+        self._path = path or os.environ.get("CONFIG_SNAPSHOT_PATH", "data/config_snapshot.json")
+
+        try:
+            data = await asyncio.to_thread(self._read, self._path)
+        except (OSError, ValueError) as error:
+            print(f"Ignoring unreadable config snapshot ({error!r})")
+            return
+
+        if data is None:
+            return
+
+        if data.get("version") != self.VERSION:
+            print(f"Ignoring config snapshot written by version {data.get('version')}.")
+            return
+
+        self._guilds = {int(guild_id): config for guild_id, config in data["guilds"].items()}
+        print(f"Config snapshot holds {len(self._guilds)} guild(s).")
+
+####################################################################################################
+    def start(self, collect: Callable[[], Dict[int, Optional[Dict[str, Any]]]]) -> None:
+        """Begins writing the snapshot periodically.
+
+        ``collect`` returns the current config of each guild keyed by ID. A value of
+        ``None`` keeps that guild's previous entry, for guilds known but not loaded.
+        Once :meth:`settle` has been called, guilds missing from the result are
+        dropped from the snapshot; until then they're kept.
+        """
+
+        self._collect = collect
+
+        if self._task is None:
+            self._task = asyncio.create_task(self._write_loop())
+
+####################################################################################################
+    def settle(self) -> None:
+        """Notes that every guild the bot is in has been seen, so guilds missing
+        from ``collect`` have really gone. Before then, they may just not have
+        been delivered by Discord yet."""
+
+        self._settled = True
+
+####################################################################################################
+    def changed(self) -> None:
+        """Notes that a guild's config changed, writing the snapshot shortly after."""
+
+        if self._collect is None:
+            return
+
+        self._dirty = True
+        if self._pending is None or self._pending.done():
+            self._pending = asyncio.create_task(self._write_soon())
+
+####################################################################################################
+    async def _write_soon(self) -> None:
+
+        # Changes made while a write is under way are picked up by another pass.
+        while self._dirty:
+            await asyncio.sleep(float(os.environ.get("CONFIG_SNAPSHOT_DELAY", 1)))
+            self._dirty = False
+            await self.write()
+
+####################################################################################################
+    async def stop(self) -> None:
+        """Stops the periodic writes and writes out the final state."""
+
+        for task in (self._task, self._pending):
+            if task is not None:
+                task.cancel()
+        self._task = self._pending = None
+
+        await self.write()
+
+####################################################################################################
+    async def write(self) -> None:
+
+        if self._collect is None or self._path is None:
+            return
+
+        async with self._lock:
+            await self._write()
+
+####################################################################################################
+    async def _write(self) -> None:
+
+        guilds = {} if self._settled else dict(self._guilds)
+        for guild_id, config in self._collect().items():
+            config = config if config is not None else self._guilds.get(guild_id)
+            if config:
+                guilds[guild_id] = config
+            else:
+                guilds.pop(guild_id, None)
+
+        encoded = json.dumps(
+            {"version": self.VERSION, "guilds": {str(k): v for k, v in guilds.items()}},
+            sort_keys=True
+        )
+        if encoded == self._written:
+            return
+
+        try:
+            await asyncio.to_thread(self._replace, self._path, encoded)
+        except OSError as error:
+            print(f"Failed writing config snapshot: {error!r}")
+            return
+
+        self._guilds = guilds
+        self._written = encoded
+
+####################################################################################################
+    async def _write_loop(self) -> None:
+
+        interval = float(os.environ.get("CONFIG_SNAPSHOT_INTERVAL", 30))
+
+        while True:
+            await asyncio.sleep(interval)
+            await self.write()
+
+####################################################################################################
+    @staticmethod
+    def _read(path: str) -> Optional[Dict[str, Any]]:
+
+        if not os.path.exists(path):
+            return None
+
+        with open(path, "r") as snapshot:
+            return json.load(snapshot)
+
+####################################################################################################
+    @staticmethod
+    def _replace(path: str, encoded: str) -> None:
+
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+
+        temp = f"{path}.tmp"
+        with open(temp, "w") as snapshot:
+            snapshot.write(encoded)
+            snapshot.flush()
+            os.fsync(snapshot.fileno())
+
+        os.replace(temp, path)
+
+####################################################################################################
+# The shared snapshot, read at startup and kept up to date while the bot runs.
+
+config_snapshot = ConfigSnapshot()
+
+####################################################################################################
@@ -0,0 +1,292 @@
+from __future__ import annotations
+
+import asyncio
+import os
+import uuid
+
+from collections    import Counter
+from datetime       import datetime
+from typing         import Dict, List, Optional, Sequence, Tuple
+
+from .database  import db
+####################################################################################################
+
+__all__ = ("CrosspostLog", "StatsBuffer", "crosspost_log", "stats_buffer")
+
+####################################################################################################
+class StatsBuffer:
+    """Aggregates posting stat increments in memory and writes them behind the
+    crosspost path as one batched, atomic ``count = count + delta`` upsert.
+
+    A flush happens every ``interval`` seconds, as soon as ``threshold`` distinct
+    (guild, role) pairs are pending, and once more when the bot shuts down.
+    A batch that fails is retried unchanged, under the same ID, before anything
+    newer, so it's counted once even if the failed attempt had in fact committed.
+
+    Environment Variables:
+    ----------------------
+    STATS_FLUSH_INTERVAL:
+        Seconds between periodic flushes. Defaults to ``30``.
+
+    STATS_FLUSH_THRESHOLD:
+        Pending (guild, role) pairs that trigger an early flush. Defaults to ``500``.
+    """
+
+    __slots__ = (
+        "_pending",
+        "_inflight",
+        "_interval",
+        "_threshold",
+        "_flush_lock",
+        "_task",
+        "_early_flush"
+    )
+
+####################################################################################################
+    def __init__(self):
+
+        self._pending: Counter[Tuple[int, int]] = Counter()
+        self._inflight: Optional[Tuple[str, Counter[Tuple[int, int]]]] = None
+        self._interval: float = 30.0
+        self._threshold: int = 500
+
+        self._flush_lock: asyncio.Lock = asyncio.Lock()
+        self._task: Optional[asyncio.Task] = None
+        self._early_flush: Optional[asyncio.Task] = None
+
+####################################################################################################
+    @property
+    def pending(self) -> Dict[Tuple[int, int], int]:
+        """A copy of the not-yet-flushed increments, keyed by ``(guild_id, role_id)``."""
+
+        pending = Counter(self._pending)
+        if self._inflight is not None:
+            pending.update(self._inflight[1])
+
+        return dict(pending)
+
+####################################################################################################
+    def start(self) -> None:
+
+        if self._task is not None:
+            return
+
+        self._interval = float(os.environ.get("STATS_FLUSH_INTERVAL", self._interval))
+        self._threshold = int(os.environ.get("STATS_FLUSH_THRESHOLD", self._threshold))
+
+        self._task = asyncio.create_task(self._flush_loop())
+
+####################################################################################################
+    async def stop(self) -> None:
+        """Stops the periodic flush and writes out anything still pending."""
+
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+
+        await self.flush()
+
+####################################################################################################
+    def add(self, guild_id: int, role_id: int, amount: int = 1) -> None:
+
+        self._pending[(guild_id, role_id)] += amount
+
+        if len(self._pending) >= self._threshold and self._task is not None:
+            if self._early_flush is None or self._early_flush.done():
+                self._early_flush = asyncio.create_task(self.flush())
+
+####################################################################################################
+    async def flush(self) -> None:
+
+        async with self._flush_lock:
+            if self._inflight is None:
+                if not self._pending:
+                    return
+
+                self._inflight = (uuid.uuid4().hex, self._pending)
+                self._pending = Counter()
+
+            batch_id, batch = self._inflight
+
+            try:
+                await db.add_job_stats(
+                    batch_id,
+                    [(guild_id, role_id, amount) for (guild_id, role_id), amount in batch.items()]
+                )
+            except Exception as error:
+                # Kept as is, so the retry can be recognised if this attempt did commit.
+                print(f"Failed to flush {len(batch)} job stat(s): {error!r}")
+                return
+
+            self._inflight = None
+
+####################################################################################################
+    async def _flush_loop(self) -> None:
+
+        while True:
+            await asyncio.sleep(self._interval)
+            await self.flush()
+
+####################################################################################################
+class CrosspostLog:
+    """Buffers crosspost events and appends them to the ``crosspost_events`` log in
+    batches, then periodically folds the log into the hourly and daily rollup
+    tables that stats views read from, pruning raw events once they're old.
+
+    Environment Variables:
+    ----------------------
+    CROSSPOST_LOG_FLUSH_INTERVAL:
+        Seconds between batched event writes. Defaults to ``30``.
+
+    CROSSPOST_ROLLUP_INTERVAL:
+        Seconds between rollup and pruning passes. Defaults to ``300``.
+
+    CROSSPOST_EVENT_RETENTION_DAYS:
+        Days raw events are kept after being rolled up. Defaults to ``30``.
+
+    CROSSPOST_HOURLY_RETENTION_DAYS:
+        Days hourly rollups are kept. Daily rollups are never pruned. Defaults to ``90``.
+
+    CROSSPOST_LOG_MAX_PENDING:
+        Buffered events kept while writes are failing. Past this, the oldest are
+        dropped and counted in the log. Defaults to ``10000``.
+    """
+
+    __slots__ = (
+        "_pending",
+        "_inflight",
+        "_max_pending",
+        "_dropped",
+        "_flush_lock",
+        "_tasks"
+    )
+
+####################################################################################################
+    def __init__(self):
+
+        self._pending: List[Tuple[int, int, int, List[int], List[int], datetime]] = []
+        self._inflight: Optional[Tuple[str, List[Tuple[int, int, int, List[int], List[int], datetime]]]] = None
+        self._max_pending: int = 10000
+        self._dropped: int = 0
+        self._flush_lock: asyncio.Lock = asyncio.Lock()
+        self._tasks: List[asyncio.Task] = []
+
+####################################################################################################
+    @property
+    def pending(self) -> int:
+
+        return len(self._pending) + (len(self._inflight[1]) if self._inflight is not None else 0)
+
+####################################################################################################
+    def start(self) -> None:
+
+        if self._tasks:
+            return
+
+        self._max_pending = int(os.environ.get("CROSSPOST_LOG_MAX_PENDING", self._max_pending))
+
+        self._tasks = [
+            asyncio.create_task(self._flush_loop()),
+            asyncio.create_task(self._rollup_loop())
+        ]
+
+####################################################################################################
+    async def stop(self) -> None:
+        """Stops the background loops and writes out any buffered events."""
+
+        for task in self._tasks:
+            task.cancel()
+        self._tasks = []
+
+        await self.flush()
+
+####################################################################################################
+    def record(
+        self,
+        guild_id: int,
+        thread_id: int,
+        channel_id: int,
+        tag_ids: Sequence[int],
+        role_ids: Sequence[int],
+        posted_at: datetime
+    ) -> None:
+
+        self._pending.append(
+            (guild_id, thread_id, channel_id, list(tag_ids), list(role_ids), posted_at)
+        )
+
+        # Only grows past the cap while the database is refusing writes.
+        if len(self._pending) > self._max_pending:
+            del self._pending[0]
+            self._dropped += 1
+
+####################################################################################################
+    async def flush(self) -> None:
+
+        if self._dropped:
+            print(f"Dropped {self._dropped} crosspost event(s) over the buffer limit.")
+            self._dropped = 0
+
+        async with self._flush_lock:
+            if self._inflight is None:
+                if not self._pending:
+                    return
+
+                self._inflight = (uuid.uuid4().hex, self._pending)
+                self._pending = []
+
+            batch_id, batch = self._inflight
+
+            try:
+                await db.insert_crosspost_events(batch_id, batch)
+            except Exception as error:
+                # Retried unchanged under the same ID, so a committed attempt isn't logged twice.
+                print(f"Failed to write {len(batch)} crosspost event(s): {error!r}")
+                return
+
+            self._inflight = None
+
+####################################################################################################
+    async def roll_up(self) -> None:
+        """Writes buffered events, folds the log into the rollups and prunes old rows."""
+
+        await self.flush()
+
+        try:
+            folded = await db.roll_up_crosspost_events()
+            await db.prune_crosspost_events(
+                int(os.environ.get("CROSSPOST_EVENT_RETENTION_DAYS", 30)),
+                int(os.environ.get("CROSSPOST_HOURLY_RETENTION_DAYS", 90))
+            )
+        except Exception as error:
+            print(f"Failed to roll up crosspost events: {error!r}")
+            return
+
+        if folded:
+            print(f"Rolled up {folded} crosspost event(s).")
+
+####################################################################################################
+    async def _flush_loop(self) -> None:
+
+        interval = float(os.environ.get("CROSSPOST_LOG_FLUSH_INTERVAL", 30))
+
+        while True:
+            await asyncio.sleep(interval)
+            await self.flush()
+
+####################################################################################################
+    async def _rollup_loop(self) -> None:
+
+        interval = float(os.environ.get("CROSSPOST_ROLLUP_INTERVAL", 300))
+
+        while True:
+            await asyncio.sleep(interval)
+            await self.roll_up()
+
+####################################################################################################
+# The shared buffers, started alongside the database pool.
+
+stats_buffer = StatsBuffer()
+crosspost_log = CrosspostLog()
+
+####################################################################################################
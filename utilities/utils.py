@@ -3,6 +3,7 @@ from discord        import (
     Colour,
     Embed,
     EmbedField,
+    Interaction,
 )
 from discord.embeds import EmptyEmbed
 from typing         import (
@@ -17,8 +18,8 @@ from .colors    import random_all
 ####################################################################################################
 
 __all__ = (
-    "convert_database_list",
     "make_embed",
+    "respond",
     "SeparatorField"
 )
 
@@ -28,30 +29,6 @@ class SeparatorField(EmbedField):
     def __init__(self, length: int):
         super().__init__("=" * (5 * length), "** **", False)
 
-####################################################################################################
-def convert_database_list(data: str) -> List[str]:
-    """Helper function to convert a list stored as text in the
-    database back into a Python list.
-
-    Parameters:
-    -----------
-        data: :class:`str
-            The database text result to be parsed.
-
-    Returns:
-    --------
-    List[:class:`str`]
-        A list with the string versions of all listed items.
-
-    """
-
-    if not data or data == "{}":
-        return []
-
-    base_list = [i for i in data[1:-1].split(",")]
-
-    return [i.strip("'").strip('"') for i in base_list]
-
 ####################################################################################################
 def make_embed(
     *,
@@ -162,6 +139,16 @@ def make_embed(
 
     return embed
 
+####################################################################################################
+async def respond(interaction: Interaction, **kwargs) -> None:
+    """Sends the initial response to ``interaction``, or a followup message if it
+    was already responded to or deferred, e.g. while guild data was being loaded."""
+
+    if interaction.response.is_done():
+        await interaction.followup.send(**kwargs)
+    else:
+        await interaction.response.send_message(**kwargs)
+
 ####################################################################################################
 
 ####################################################################################################